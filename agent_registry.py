@@ -0,0 +1,249 @@
+"""Stage definitions for the summary pipeline
+
+The registry is built once per process when this module is imported. Each request
+only creates AgentStatus objects for the stages it runs; prompts, templates and
+token limits are shared.
+"""
+from dataclasses import dataclass, field
+from typing import Dict
+
+from llm_client import MAX_OUTPUT_TOKENS
+from stage_graph import StageGraph
+
+# Every call is laid out for Azure OpenAI prompt caching, which reuses the longest prompt prefix
+# already seen in 128-token steps. Messages are: SYSTEM_PREFIX, identical for every call of every
+# document; then the source text (DOCUMENT_REFERENCE or another reference), identical for all stages
+# of one document; then the stage template, with its static instructions first and variable inputs last.
+# Nothing before a call's last message may depend on the stage.
+# Any change to these texts must bump agents.PROMPT_VERSION.
+SYSTEM_PREFIX = """You are an AI assistant in a multi-agent system that creates concise and informative summaries of client interactions for Relationship Managers (RMs). Each request gives you the source material first and your task last.
+
+Every client interaction summary MUST use the following exact format (WITHOUT any ** markdown formatting):
+
+Client Interaction Summary
+Date of Meeting: [Insert Date] 
+Participants: [List Participants] 
+Client Name: [Insert Client Name] 
+Meeting Type: [Call/Meeting/Other]
+
+1. Objectives of the Meeting : 
+[Clearly state the purpose and goals of the meeting]
+
+2. Key Discussion Points : 
+[List the main topics, issues, and subjects discussed during the interaction]
+
+3. Decisions Made : 
+[Document any decisions, agreements, or resolutions reached during the meeting]
+
+4. Action Items :
+[List specific action items with responsible for RM and Client separately and timelines where mentioned]
+
+Key Takeaways :
+[Summarize the most important topics in bullet points, outcomes, or next steps from the meeting]
+
+Rules for every summary:
+1. Always use the exact format structure shown above with the same headings but NO ** markdown formatting
+2. Extract relevant information from the source and place it under the appropriate sections
+3. If information for any section is not available in the document, note "[Information not available in document]"
+4. For each section, provide clear, concise information about what was discussed
+5. Highlight any important decisions, action items, or follow-up tasks
+6. Keep the language professional and objective throughout the summary
+7. Ensure the summary is concise while capturing all essential information
+8. If any part of the interaction is unclear or seems to be missing context, note this in the relevant section
+9. DO NOT use any ** formatting or markdown - output clean, plain text with proper headings"""
+
+# Source messages placed between SYSTEM_PREFIX and the stage prompt
+DOCUMENT_REFERENCE = """Client interaction document:
+
+{document_text}"""
+
+ANALYSIS_REFERENCE = """Analysis of every part of the client interaction document (the document itself is omitted for length):
+
+{analysis_result}"""
+
+EXCERPTS_REFERENCE = """Source excerpts cited by the analysis:
+
+{cited}"""
+
+# Stage prompts; each is the last message of its call
+ANALYSIS_PROMPT = """Task: analyze the client interaction document above and identify:
+1. Participants involved
+2. Main topics discussed
+3. Key decisions made
+4. Action items mentioned
+5. Important dates or deadlines
+6. Overall meeting context"""
+
+# Parallel extraction: three independent prompts that together replace ANALYSIS_PROMPT
+MEETING_DETAILS_PROMPT = """Task: from the client interaction document above, extract only:
+1. Date of the meeting
+2. Participants and their roles
+3. Client name
+4. Meeting type (call, meeting or other)
+5. Objectives of the meeting
+
+Write "Not stated" for anything the document does not contain. Be brief."""
+
+DECISIONS_PROMPT = """Task: from the client interaction document above, extract only:
+1. Main topics discussed
+2. Decisions, agreements or resolutions reached
+3. Open questions or unclear points
+
+Write "None" for a list the document gives no items for. Be brief."""
+
+ACTION_ITEMS_PROMPT = """Task: from the client interaction document above, extract only the action items and next steps.
+For each one give the owner (RM or client), the task and any deadline or date mentioned,
+listing the RM's items and the client's items separately.
+
+Write "None" if the document mentions no action items. Be brief."""
+
+COMPACT_ANALYSIS_PROMPT = """Task: analyze the client interaction document above and return ONLY a JSON object with this shape:
+{schema}
+
+Rules:
+- At most {max_list_items} items per list and at most {max_item_words} words per item
+- Use null or an empty list when the document does not contain the information
+- Every "evidence" entry must be copied verbatim from the document (at most 25 words)
+- Output the JSON object only, with no commentary"""
+
+SUMMARY_PROMPT = """Task: generate the client interaction summary in the required format, based on the document analysis below and on the source above.
+- Note "[Information not available in document]" for any section without information
+- Output clean, plain text without any ** formatting
+
+Document analysis:
+{analysis_result}"""
+
+COMPACT_SUMMARY_PROMPT = """Task: generate the client interaction summary in the required format, based only on the structured analysis below.
+- Null values and empty lists mean "[Information not available in document]"
+- Mention anything listed under unclear_points in the relevant section
+- Output clean, plain text without any ** formatting
+
+Structured analysis (JSON):
+{analysis_result}"""
+
+FAST_SUMMARY_PROMPT = """Task: generate the client interaction summary in the required format directly from the client interaction document above.
+- Note "[Information not available in document]" for any section without information
+- If any part is unclear or missing context, note this in the relevant section
+- Output clean, plain text without any ** formatting"""
+
+REVIEW_PROMPT = """Task: as a Quality Reviewer, review the summary below against the source above to ensure it follows the exact required format and meets RM standards.
+
+Verify that the summary:
+1. Uses the exact format structure with proper headings but NO ** markdown formatting
+2. Has all required sections present
+3. Contains relevant information under each section
+4. Notes "[Information not available in document]" for missing information
+5. Maintains professional and objective language
+6. Is concise while capturing essential information
+7. Notes any unclear parts or missing context in relevant sections
+8. Does NOT contain any ** formatting - output should be clean plain text
+
+Provide the final, polished summary that strictly follows the required format WITHOUT any ** markdown formatting.
+
+Summary to review:
+{summary_result}"""
+
+COMPACT_REVIEW_PROMPT = """Task: as a Quality Reviewer, review the summary below against the cited source excerpts above to ensure it follows the exact required format and meets RM standards.
+
+Verify that the summary:
+1. Uses the exact format structure with proper headings but NO ** markdown formatting
+2. Has all required sections present
+3. Agrees with the source excerpts on decisions, action items, owners and dates
+4. Notes "[Information not available in document]" for missing information
+5. Maintains professional, objective and concise language
+
+Provide the final, polished summary that strictly follows the required format WITHOUT any ** markdown formatting.
+
+Summary to review:
+{summary_result}"""
+
+
+@dataclass(frozen=True)
+class StageDefinition:
+    """One agent in the pipeline: its prompt templates and output token budget; every call shares SYSTEM_PREFIX"""
+    name: str
+    # Prompt variants by pipeline mode, filled in with str.format
+    templates: Dict[str, str] = field(default_factory=dict)
+    max_output_tokens: int = MAX_OUTPUT_TOKENS
+    # Each call's output budget is input tokens * output_ratio, kept between these two limits
+    min_output_tokens: int = 512
+    output_ratio: float = 0.5
+    # Per-template floors that replace min_output_tokens, for outputs whose size does not follow the input
+    template_min_output_tokens: Dict[str, int] = field(default_factory=dict)
+    
+    def render(self, template: str, **values) -> str:
+        return self.templates[template].format(**values)
+
+
+STAGE_REGISTRY: Dict[str, StageDefinition] = {stage.name: stage for stage in [
+    StageDefinition(
+        name="DocumentAnalyzer",
+        templates={"full": ANALYSIS_PROMPT, "compact": COMPACT_ANALYSIS_PROMPT},
+        # The compact JSON analysis is bounded by its schema rather than the input, and a JSON object cut
+        # short cannot be parsed, so it always gets the full limit
+        template_min_output_tokens={"compact": MAX_OUTPUT_TOKENS},
+    ),
+    StageDefinition(
+        name="MeetingDetailsExtractor",
+        templates={"full": MEETING_DETAILS_PROMPT},
+        max_output_tokens=512,
+        min_output_tokens=256,
+        output_ratio=0.25,
+    ),
+    StageDefinition(
+        name="DecisionExtractor",
+        templates={"full": DECISIONS_PROMPT},
+        max_output_tokens=768,
+        min_output_tokens=256,
+        output_ratio=0.25,
+    ),
+    StageDefinition(
+        name="ActionItemExtractor",
+        templates={"full": ACTION_ITEMS_PROMPT},
+        max_output_tokens=512,
+        min_output_tokens=256,
+        output_ratio=0.25,
+    ),
+    StageDefinition(
+        name="SummaryGenerator",
+        templates={"full": SUMMARY_PROMPT, "compact": COMPACT_SUMMARY_PROMPT, "fast": FAST_SUMMARY_PROMPT},
+        # The summary and its review follow a fixed format, so short inputs still need room for every section
+        min_output_tokens=768,
+    ),
+    StageDefinition(
+        name="QualityReviewer",
+        templates={"full": REVIEW_PROMPT, "compact": COMPACT_REVIEW_PROMPT},
+        min_output_tokens=768,
+    ),
+    # Coordinator makes no model calls; it is listed so its status shows on the dashboard
+    StageDefinition(
+        name="Coordinator",
+        max_output_tokens=0,
+        min_output_tokens=0,
+    ),
+]}
+
+# Stages that call the model, in pipeline order
+MODEL_STAGES = ["DocumentAnalyzer", "SummaryGenerator", "QualityReviewer"]
+
+# Independent extractions that run side by side in place of DocumentAnalyzer, with their headings
+EXTRACTION_STAGES = {
+    "MeetingDetailsExtractor": "Meeting details",
+    "DecisionExtractor": "Discussion and decisions",
+    "ActionItemExtractor": "Action items",
+}
+
+# Which stages' output each stage needs, per pipeline; agents.py runs them with stage_graph
+STAGE_GRAPHS: Dict[str, StageGraph] = {
+    "full": StageGraph({
+        "DocumentAnalyzer": (),
+        "SummaryGenerator": ("DocumentAnalyzer",),
+        # Chunked and compact reviews check the summary against the analysis
+        "QualityReviewer": ("DocumentAnalyzer", "SummaryGenerator"),
+    }),
+    "parallel": StageGraph({
+        **{stage: () for stage in EXTRACTION_STAGES},
+        "SummaryGenerator": tuple(EXTRACTION_STAGES),
+        "QualityReviewer": ("SummaryGenerator",),
+    }),
+}
@@ -0,0 +1,754 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+import asyncio
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from llm_client import AzureOpenAIWrapper, AsyncAzureOpenAIWrapper, LLMError
+from agent_registry import (ANALYSIS_REFERENCE, DOCUMENT_REFERENCE, EXCERPTS_REFERENCE, EXTRACTION_STAGES,
+                            MODEL_STAGES, STAGE_GRAPHS, STAGE_REGISTRY, SYSTEM_PREFIX)
+from result_cache import ResultCache
+from routing import ModelRouter, Route
+from telemetry import Telemetry
+from chunking import chunk_text_stable, estimate_tokens
+from stage_graph import run_graph, run_graph_async
+from summary_format import validate_summary
+from compact_analysis import (ANALYSIS_SCHEMA, MAX_ITEM_WORDS, MAX_LIST_ITEMS, merge_analyses,
+                              parse_analysis, select_cited_excerpts)
+import json
+
+# Bump whenever the prompt templates in agent_registry change,
+# so cached results produced by older prompts are no longer served
+PROMPT_VERSION = "2026-10-v3"
+
+@dataclass
+class AgentStatus:
+    name: str
+    status: str  # active, waiting, complete, failed, skipped
+    current_task: str
+    messages: List[str]
+    time_to_first_token: Optional[float] = None  # seconds, for the most recent call
+    duration: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+
+class StageFailedError(Exception):
+    """A pipeline stage failed, so the stages after it were not run"""
+    
+    def __init__(self, stage: str, error: LLMError):
+        super().__init__(f"{stage} failed: {error}")
+        self.stage = stage
+        self.error = error
+
+class ClientSummaryAgents:
+    """Multi-agent system for client interaction summary generation"""
+    
+    def __init__(self, azure_client: AzureOpenAIWrapper, cache: ResultCache = None,
+                 chunk_token_budget: int = 6000, long_document_threshold: int = 12000,
+                 max_parallel_chunks: int = 4, streaming: bool = False, compact: bool = False,
+                 fast_mode: bool = False, fast_review_threshold: int = 3000, telemetry: Telemetry = None,
+                 parallel_extraction: bool = False, router: ModelRouter = None):
+        self.azure_client = azure_client
+        self.telemetry = telemetry
+        # Picks each call's deployment and max_tokens; the default keeps every call on azure_client's deployment
+        self.router = router or ModelRouter()
+        self.parallel_extraction = parallel_extraction
+        self.compact = compact
+        self.fast_mode = fast_mode
+        self.fast_review_threshold = fast_review_threshold
+        self.cache = cache
+        self.chunk_token_budget = chunk_token_budget
+        self.long_document_threshold = long_document_threshold
+        self.max_parallel_chunks = max_parallel_chunks
+        self.streaming = streaming
+        self.agent_statuses = {}
+        self.interaction_log = []
+        self.stage_timings = {}
+        self.stage_usage = {}
+        # Chunks of the current document whose analysis was reused from an earlier revision
+        self.reused_chunks = 0
+        # Stage graph the current document runs through, and its slowest chain of stages once run
+        self.graph = STAGE_GRAPHS["full"]
+        self.critical_path = []
+        # Monotonic start of the current document; interaction log entries are offsets from it
+        self.pipeline_start = time.monotonic()
+        self.setup_agents()
+    
+    def setup_agents(self):
+        """Create the per-request status for each agent this instance may run"""
+        for agent_name in STAGE_REGISTRY:
+            if agent_name in EXTRACTION_STAGES and not self.parallel_extraction:
+                continue
+            self.agent_statuses[agent_name] = AgentStatus(
+                name=agent_name,
+                status="waiting",
+                current_task="Initialized",
+                messages=[]
+            )
+    
+    def update_agent_status(self, agent_name: str, status: str, task: str, message: str = ""):
+        """Update agent status and log interactions"""
+        if agent_name in self.agent_statuses:
+            self.agent_statuses[agent_name].status = status
+            self.agent_statuses[agent_name].current_task = task
+            if message:
+                self.agent_statuses[agent_name].messages.append(message)
+                self.log_interaction(agent_name, message, task)
+    
+    def log_interaction(self, agent_name: str, message: str, task: str):
+        self.interaction_log.append({
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "elapsed": round(time.monotonic() - self.pipeline_start, 3),
+            "agent": agent_name,
+            "message": message,
+            "task": task
+        })
+    
+    def route_call(self, agent_name: str, messages: List[Dict]) -> Route:
+        """Route one call and record the decision in the processing log"""
+        route = self.router.route(agent_name, messages, "compact" if self.compact else "full")
+        self.log_interaction(agent_name, route.describe(self.azure_client.model), "Routing")
+        return route
+    
+    def truncation_retry(self, agent_name: str, route: Route, usage: Dict[str, int],
+                         on_delta: Callable[[str], None] = None) -> Optional[Route]:
+        """Route for retrying a reply cut off at max_tokens, or None when it cannot be retried
+        
+        The retry uses the stage's full output limit. Streamed deltas have already reached
+        on_delta, so a streamed reply is only logged as truncated.
+        """
+        if not usage.get("truncated"):
+            return None
+        max_tokens = STAGE_REGISTRY[agent_name].max_output_tokens
+        if on_delta is not None or route.max_tokens >= max_tokens:
+            self.log_interaction(agent_name, f"Reply stopped at max_tokens {route.max_tokens:,} and is truncated",
+                                 "Model call")
+            return None
+        self.log_interaction(agent_name, f"Reply stopped at max_tokens {route.max_tokens:,}; "
+                             f"retrying with {max_tokens:,}", "Routing")
+        return replace(route, max_tokens=max_tokens)
+    
+    @staticmethod
+    def merge_usage(first: Dict[str, int], retry: Dict[str, int]) -> Dict[str, int]:
+        """Token usage of a call and its retry; the truncated flag is the retry's"""
+        merged = {key: first.get(key, 0) + retry.get(key, 0) for key in set(first) | set(retry) if key != "truncated"}
+        merged["retries"] = merged.get("retries", 0) + 1
+        if retry.get("truncated"):
+            merged["truncated"] = 1
+        return merged
+    
+    def log_call_usage(self, agent_name: str, usage: Dict[str, int]) -> Dict[str, int]:
+        """Log one call's token counts, including how much of its prompt Azure served from cache"""
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        if usage.get("estimated"):
+            message = f"Call sent ~{prompt_tokens:,} prompt tokens (estimated, no usage reported)"
+        else:
+            cached = usage.get("cached_tokens", 0)
+            share = cached / prompt_tokens if prompt_tokens else 0.0
+            message = (f"Call used {prompt_tokens:,} prompt tokens ({cached:,} cached, {share:.0%}), "
+                       f"{usage.get('completion_tokens', 0):,} completion")
+        self.log_interaction(agent_name, message, "Model call")
+        return usage
+    
+    @contextmanager
+    def stage_guard(self, agent_name: str):
+        """Mark agent_name failed and stop the pipeline if a model call inside fails"""
+        try:
+            yield
+        except LLMError as e:
+            self.update_agent_status(agent_name, "failed", "Stage failed", f"Stopped pipeline: {e}")
+            raise StageFailedError(agent_name, e) from e
+    
+    def record_stage_timing(self, agent_name: str, time_to_first_token: float, duration: float):
+        """Store time-to-first-token and total duration for a stage"""
+        if agent_name in self.agent_statuses:
+            self.agent_statuses[agent_name].time_to_first_token = time_to_first_token
+            self.agent_statuses[agent_name].duration = duration
+        self.stage_timings[agent_name] = {
+            "time_to_first_token": round(time_to_first_token, 3),
+            "duration": round(duration, 3)
+        }
+    
+    def record_stage_usage(self, agent_name: str, usages: List[Dict[str, int]]):
+        """Store token usage for a stage, summed over its calls"""
+        totals = {"calls": len(usages)}
+        for usage in usages:
+            for key, value in usage.items():
+                totals[key] = totals.get(key, 0) + value
+        if agent_name in self.agent_statuses:
+            self.agent_statuses[agent_name].prompt_tokens = totals.get("prompt_tokens")
+            self.agent_statuses[agent_name].completion_tokens = totals.get("completion_tokens")
+            self.agent_statuses[agent_name].cached_tokens = totals.get("cached_tokens")
+        self.stage_usage[agent_name] = totals
+    
+    def report_telemetry(self, pipeline_path: str, chunk_count: int):
+        """Send this document's stage timings, token usage and total duration to telemetry"""
+        if self.telemetry is None:
+            return
+        for agent_name, timing in self.stage_timings.items():
+            usage = self.stage_usage.get(agent_name, {})
+            self.telemetry.record(agent_name, timing["duration"], usage, pipeline_path=pipeline_path,
+                                  time_to_first_token_ms=round(timing["time_to_first_token"] * 1000, 1),
+                                  calls=usage.get("calls", 0), estimated=bool(usage.get("estimated")))
+        self.telemetry.record("pipeline", time.monotonic() - self.pipeline_start, pipeline_path=pipeline_path,
+                              model=self.azure_client.model, chunk_count=chunk_count)
+    
+    @staticmethod
+    def complete_usage(usage: Dict[str, int], messages: List[Dict]) -> Dict[str, int]:
+        """Fall back to a local prompt-token estimate when the API reported no usage"""
+        if "prompt_tokens" in usage:
+            return usage
+        return dict(usage, prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages), estimated=1)
+    
+    def timed_call(self, agent_name: str, messages: List[Dict], on_delta: Callable[[str], None] = None):
+        """Run one model call and return (text, time_to_first_token, duration, usage)
+        
+        The router picks the deployment and output token limit from agent_name and the
+        estimated input size, and the choice is logged. Times are in seconds. With
+        streaming enabled the response is consumed delta by delta and each delta is passed
+        to on_delta; otherwise time to first token equals the full call duration.
+        """
+        route = self.route_call(agent_name, messages)
+        text, first_token, duration, usage = self.model_call(agent_name, messages, route, on_delta)
+        retry = self.truncation_retry(agent_name, route, usage, on_delta)
+        if retry is None:
+            return text, first_token, duration, usage
+        text, _, retry_duration, retry_usage = self.model_call(agent_name, messages, retry)
+        return text, first_token, duration + retry_duration, self.merge_usage(usage, retry_usage)
+    
+    def model_call(self, agent_name: str, messages: List[Dict], route: Route,
+                   on_delta: Callable[[str], None] = None):
+        """One model call on route; returns (text, time_to_first_token, duration, usage)"""
+        start = time.monotonic()
+        usage = {}
+        if not self.streaming:
+            text = self.azure_client.generate_response(messages, usage=usage, max_tokens=route.max_tokens,
+                                                       model=route.model)
+            duration = time.monotonic() - start
+            return text, duration, duration, self.log_call_usage(agent_name, self.complete_usage(usage, messages))
+        
+        parts = []
+        first_token = None
+        for delta in self.azure_client.stream_response(messages, usage=usage, max_tokens=route.max_tokens,
+                                                       model=route.model):
+            if first_token is None:
+                first_token = time.monotonic() - start
+            parts.append(delta)
+            if on_delta is not None:
+                on_delta(delta)
+        duration = time.monotonic() - start
+        first_token = first_token if first_token is not None else duration
+        usage = self.log_call_usage(agent_name, self.complete_usage(usage, messages))
+        return "".join(parts), first_token, duration, usage
+    
+    @staticmethod
+    def stage_messages(agent_name: str, template: str, reference: str = "", **values) -> List[Dict]:
+        """SYSTEM_PREFIX, then the reference text, then the stage prompt with its variable inputs last
+        
+        Everything before the last message is byte-identical across the stages of a
+        document, so Azure's prompt caching can serve it once the first stage has run.
+        """
+        messages = [{"role": "system", "content": SYSTEM_PREFIX}]
+        if reference:
+            messages.append({"role": "user", "content": reference})
+        messages.append({"role": "user", "content": STAGE_REGISTRY[agent_name].render(template, **values)})
+        return messages
+    
+    @staticmethod
+    def document_reference(document_text: str) -> str:
+        return DOCUMENT_REFERENCE.format(document_text=document_text)
+    
+    def chunk_analysis_key(self, chunk: str) -> str:
+        """Cache key of one chunk's raw analysis, which does not depend on the rest of the document"""
+        prompt_version = PROMPT_VERSION + ":chunk-analysis" + (":compact" if self.compact else "")
+        if self.router.signature:
+            prompt_version += ":" + self.router.signature
+        return ResultCache.make_key(chunk, self.azure_client.model, self.azure_client.api_version, prompt_version)
+    
+    def reusable_analyses(self, chunks: List[str]) -> List[Optional[str]]:
+        """Cached raw analysis of each chunk seen in an earlier revision, None where the model must run"""
+        if self.cache is None:
+            return [None] * len(chunks)
+        entries = [self.cache.get(self.chunk_analysis_key(chunk), chunk=True) for chunk in chunks]
+        return [entry["analysis"] if entry else None for entry in entries]
+    
+    def merge_chunk_analyses(self, chunks: List[str], analyses: List[Optional[str]], pending: List[int],
+                             calls: List[tuple], start: float) -> str:
+        """Fill in and cache the fresh analyses, record the stage, and reduce all of them into one input"""
+        for idx, call in zip(pending, calls):
+            analyses[idx] = call[0]
+            if self.cache is not None:
+                self.cache.put(self.chunk_analysis_key(chunks[idx]), {"analysis": call[0]})
+        self.reused_chunks = len(chunks) - len(pending)
+        self.record_stage_timing("DocumentAnalyzer", min((call[1] for call in calls), default=0.0),
+                                 time.monotonic() - start)
+        self.record_stage_usage("DocumentAnalyzer", [call[3] for call in calls])
+        return self.reduce_analyses(analyses)
+    
+    def analyze_chunks(self, chunks: List[str]) -> str:
+        """Map step: analyze changed chunks in parallel, then reduce the partial analyses into one input
+        
+        Chunks analyzed before, typically the unchanged parts of a revised document,
+        reuse their cached analysis, so only the edited chunks cost model calls.
+        """
+        analyses = self.reusable_analyses(chunks)
+        pending = [idx for idx, analysis in enumerate(analyses) if analysis is None]
+        workers = max(1, min(self.max_parallel_chunks, len(pending)))
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            calls = list(executor.map(
+                lambda idx: self.timed_call("DocumentAnalyzer", self.analysis_messages(chunks[idx])),
+                pending
+            ))
+        return self.merge_chunk_analyses(chunks, analyses, pending, calls, start)
+    
+    def chunk_analysis_message(self, chunks: List[str]) -> str:
+        """Interaction log entry for a finished chunked analysis"""
+        if self.reused_chunks:
+            return (f"Re-analyzed {len(chunks) - self.reused_chunks} of {len(chunks)} chunks, reused the "
+                    f"cached analysis of the unchanged ones and merged the partial analyses")
+        return f"Analyzed {len(chunks)} chunks and merged the partial analyses"
+    
+    def analysis_messages(self, document_text: str) -> List[Dict]:
+        """Messages for analyzing a document or one chunk of it"""
+        if self.compact:
+            # Compact mode asks for a structured, size-bounded analysis
+            return self.stage_messages(
+                "DocumentAnalyzer", "compact", self.document_reference(document_text), schema=ANALYSIS_SCHEMA,
+                max_list_items=MAX_LIST_ITEMS, max_item_words=MAX_ITEM_WORDS
+            )
+        return self.stage_messages("DocumentAnalyzer", "full", self.document_reference(document_text))
+    
+    def reduce_analyses(self, partial_analyses: List[str]) -> str:
+        """Combine raw per-chunk analyses into the analysis handed to SummaryGenerator"""
+        if self.compact:
+            merged = merge_analyses([parse_analysis(partial) for partial in partial_analyses])
+            return json.dumps(merged, indent=1, ensure_ascii=False)
+        if len(partial_analyses) == 1:
+            return partial_analyses[0]
+        return "\n\n".join(
+            f"Analysis of part {idx} of {len(partial_analyses)}:\n{partial.strip()}"
+            for idx, partial in enumerate(partial_analyses, start=1)
+        )
+    
+    def summary_messages(self, document_text: str, chunks: List[str], analysis_result: str) -> List[Dict]:
+        """Messages for the SummaryGenerator stage"""
+        if self.compact:
+            # Compact mode works from the structured analysis alone
+            return self.stage_messages("SummaryGenerator", "compact", analysis_result=analysis_result)
+        if len(chunks) > 1:
+            # The merged analysis covers the whole transcript, so later stages never see the raw text
+            return self.stage_messages("SummaryGenerator", "full", analysis_result=analysis_result)
+        return self.stage_messages("SummaryGenerator", "full", self.document_reference(document_text),
+                                   analysis_result=analysis_result)
+    
+    def review_messages(self, document_text: str, chunks: List[str], analysis_result: str,
+                        summary_result: str) -> List[Dict]:
+        """Messages for the QualityReviewer stage"""
+        if self.compact:
+            # Compact mode checks the summary against the cited excerpts only
+            evidence = json.loads(analysis_result).get("evidence", [])
+            excerpts = select_cited_excerpts(document_text, evidence)
+            cited = "\n\n".join(f"[{idx}] {excerpt}" for idx, excerpt in enumerate(excerpts, start=1))
+            reference = EXCERPTS_REFERENCE.format(cited=cited or "[No excerpts cited]")
+            return self.stage_messages("QualityReviewer", "compact", reference, summary_result=summary_result)
+        if len(chunks) > 1:
+            reference = ANALYSIS_REFERENCE.format(analysis_result=analysis_result)
+        else:
+            reference = self.document_reference(document_text)
+        return self.stage_messages("QualityReviewer", "full", reference, summary_result=summary_result)
+    
+    def fast_messages(self, document_text: str) -> List[Dict]:
+        """Single call that goes straight from document to final summary (fast mode)"""
+        return self.stage_messages("SummaryGenerator", "fast", self.document_reference(document_text))
+    
+    def fast_review_messages(self, document_text: str, summary_result: str) -> List[Dict]:
+        """Review of a fast summary against the whole document; fast mode has no analysis, even when compact"""
+        return self.stage_messages("QualityReviewer", "full", self.document_reference(document_text),
+                                   summary_result=summary_result)
+    
+    def fast_review_reasons(self, document_text: str, summary: str) -> List[str]:
+        """Why a fast-path summary still needs QualityReviewer; empty when it can ship as is"""
+        reasons = validate_summary(summary)
+        if estimate_tokens(document_text) > self.fast_review_threshold:
+            reasons.append(f"Document exceeds {self.fast_review_threshold} tokens")
+        return reasons
+    
+    def skip_stage(self, agent_name: str, reason: str):
+        """Mark a stage as not run on this path"""
+        self.update_agent_status(agent_name, "skipped", reason, f"Skipped: {reason}")
+    
+    def skip_unused_stages(self):
+        """Mark the model stages outside the current stage graph as skipped"""
+        for agent_name in self.agent_statuses:
+            if agent_name in self.graph or agent_name not in MODEL_STAGES + list(EXTRACTION_STAGES):
+                continue
+            if agent_name == "DocumentAnalyzer":
+                self.skip_stage(agent_name, "Replaced by parallel extractions")
+            else:
+                self.skip_stage(agent_name, "Long and compact documents use the Document Analyzer")
+    
+    def run_model_stage(self, agent_name: str, messages: List[Dict], task: str, done_task: str,
+                        done_message: str, on_delta: Callable[[str], None] = None) -> str:
+        """Run a single-call stage with its status updates, timing and usage, and return its output"""
+        self.update_agent_status(agent_name, "active", task)
+        with self.stage_guard(agent_name):
+            text, first_token, duration, usage = self.timed_call(agent_name, messages, on_delta)
+        self.record_stage_timing(agent_name, first_token, duration)
+        self.record_stage_usage(agent_name, [usage])
+        self.update_agent_status(agent_name, "complete", done_task, done_message)
+        return text
+    
+    def run_analysis(self, document_text: str, chunks: List[str]) -> str:
+        """DocumentAnalyzer stage over the whole document, or map-reduce over its chunks"""
+        if len(chunks) == 1:
+            raw_analysis = self.run_model_stage(
+                "DocumentAnalyzer", self.analysis_messages(document_text), "Analyzing document structure",
+                "Document analysis complete", "Analyzed document and identified key components"
+            )
+            return self.reduce_analyses([raw_analysis])
+        self.update_agent_status("DocumentAnalyzer", "active",
+                                 f"Analyzing {len(chunks)} document chunks in parallel")
+        with self.stage_guard("DocumentAnalyzer"):
+            analysis_result = self.analyze_chunks(chunks)
+        self.update_agent_status("DocumentAnalyzer", "complete", "Document analysis complete",
+                                 self.chunk_analysis_message(chunks))
+        return analysis_result
+    
+    @staticmethod
+    def merge_extractions(outputs: Dict[str, str]) -> str:
+        """Analysis for SummaryGenerator: DocumentAnalyzer's output, or the parallel extractions under headings"""
+        if "DocumentAnalyzer" in outputs:
+            return outputs["DocumentAnalyzer"]
+        return "\n\n".join(f"{heading}:\n{outputs[stage].strip()}"
+                           for stage, heading in EXTRACTION_STAGES.items() if stage in outputs)
+    
+    def stage_runners(self, document_text: str, chunks: List[str],
+                      on_summary_delta: Callable[[str], None] = None) -> Dict[str, Callable]:
+        """Runner for each stage in STAGE_GRAPHS; it receives the outputs of the stages it depends on"""
+        runners = {
+            "DocumentAnalyzer": lambda needs: self.run_analysis(document_text, chunks),
+            "SummaryGenerator": lambda needs: self.run_model_stage(
+                "SummaryGenerator", self.summary_messages(document_text, chunks, self.merge_extractions(needs)),
+                "Generating structured summary", "Summary generation complete",
+                "Generated structured summary with required format"
+            ),
+            "QualityReviewer": lambda needs: self.run_model_stage(
+                "QualityReviewer",
+                self.review_messages(document_text, chunks, needs.get("DocumentAnalyzer", ""), needs["SummaryGenerator"]),
+                "Reviewing summary quality", "Quality review complete",
+                "Completed final review and provided polished summary", on_summary_delta
+            ),
+        }
+        for stage, heading in EXTRACTION_STAGES.items():
+            messages = self.stage_messages(stage, "full", self.document_reference(document_text))
+            runners[stage] = lambda needs, stage=stage, heading=heading, messages=messages: self.run_model_stage(
+                stage, messages, f"Extracting {heading.lower()}", "Extraction complete", f"Extracted {heading.lower()}"
+            )
+        return runners
+    
+    def finalize_graph(self, cache_key: str, chunks: List[str], outputs: Dict[str, str]) -> Dict[str, Any]:
+        """Record the critical path of a stage graph run and build its result"""
+        durations = {stage: timing["duration"] for stage, timing in self.stage_timings.items()}
+        self.critical_path, _ = self.graph.critical_path(durations)
+        if self.graph is STAGE_GRAPHS["parallel"]:
+            pipeline_path = "parallel"
+        else:
+            pipeline_path = "incremental" if self.reused_chunks else "full"
+        return self.finalize_result(cache_key, chunks, self.merge_extractions(outputs), outputs["SummaryGenerator"],
+                                    outputs["QualityReviewer"], pipeline_path)
+    
+    def prepare_document(self, document_text: str, format_template: str,
+                         long_document_mode: bool = None):
+        """Decide how the document is chunked and compute its cache key"""
+        self.pipeline_start = time.monotonic()
+        self.reused_chunks = 0
+        self.critical_path = []
+        if long_document_mode is None:
+            long_document_mode = estimate_tokens(document_text) > self.long_document_threshold
+        # Content-defined boundaries keep the unchanged chunks of a revised document identical
+        chunks = chunk_text_stable(document_text, self.chunk_token_budget) if long_document_mode else [document_text]
+        # The extraction prompts read the raw document, so chunked and compact runs keep DocumentAnalyzer
+        use_parallel = self.parallel_extraction and len(chunks) == 1 and not self.compact
+        self.graph = STAGE_GRAPHS["parallel" if use_parallel else "full"]
+        
+        cache_key = None
+        if self.cache is not None:
+            prompt_version = PROMPT_VERSION
+            if len(chunks) > 1:
+                prompt_version += f":chunked-{self.chunk_token_budget}"
+            if self.compact:
+                prompt_version += ":compact"
+            if self.fast_mode and len(chunks) == 1:
+                prompt_version += f":fast-{self.fast_review_threshold}"
+            elif use_parallel:
+                prompt_version += ":parallel"
+            if self.router.signature:
+                prompt_version += ":" + self.router.signature
+            cache_key = ResultCache.make_key(
+                document_text,
+                self.azure_client.model,
+                self.azure_client.api_version,
+                prompt_version,
+                format_template
+            )
+        return chunks, cache_key
+    
+    def cached_result(self, cache_key: str, chunks: List[str]) -> Dict[str, Any]:
+        """Return the stored result for cache_key, or None on a miss"""
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        
+        for agent_name in MODEL_STAGES + list(EXTRACTION_STAGES):
+            self.update_agent_status(agent_name, "complete", "Served from cache",
+                                   "Reused stored result for identical document")
+        self.report_telemetry("cache", len(chunks))
+        return {
+            "analysis": cached["analysis"],
+            "initial_summary": cached["initial_summary"],
+            "final_summary": cached["final_summary"],
+            "processing_log": self.interaction_log.copy(),
+            "cache_hit": True,
+            "chunk_count": len(chunks),
+            "reused_chunks": 0,
+            "critical_path": [],
+            "stage_timings": {},
+            "token_usage": {},
+            "pipeline_path": "cache"
+        }
+    
+    def finalize_result(self, cache_key: str, chunks: List[str], analysis_result: str,
+                        summary_result: str, final_summary: str, pipeline_path: str = "full") -> Dict[str, Any]:
+        """Store a fresh result in the cache and build the result dict"""
+        if cache_key is not None:
+            self.cache.put(cache_key, {
+                "analysis": analysis_result,
+                "initial_summary": summary_result,
+                "final_summary": final_summary
+            })
+        
+        self.report_telemetry(pipeline_path, len(chunks))
+        return {
+            "analysis": analysis_result,
+            "initial_summary": summary_result,
+            "final_summary": final_summary,
+            "processing_log": self.interaction_log.copy(),
+            "cache_hit": False,
+            "chunk_count": len(chunks),
+            "reused_chunks": self.reused_chunks,
+            "critical_path": list(self.critical_path),
+            "stage_timings": dict(self.stage_timings),
+            "token_usage": dict(self.stage_usage),
+            "pipeline_path": pipeline_path
+        }
+    
+    def process_fast(self, document_text: str, chunks: List[str], cache_key: str,
+                     on_summary_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Fast path: one SummaryGenerator call, with QualityReviewer only when validation asks for it"""
+        for agent_name in ["DocumentAnalyzer", *EXTRACTION_STAGES]:
+            self.skip_stage(agent_name, "Fast path")
+        self.update_agent_status("SummaryGenerator", "active", "Generating summary in a single call")
+        
+        messages = self.fast_messages(document_text)
+        with self.stage_guard("SummaryGenerator"):
+            summary_result, first_token, duration, usage = self.timed_call("SummaryGenerator", messages)
+        self.record_stage_timing("SummaryGenerator", first_token, duration)
+        self.record_stage_usage("SummaryGenerator", [usage])
+        self.update_agent_status("SummaryGenerator", "complete", "Summary generation complete",
+                               "Generated summary directly from the document")
+        
+        reasons = self.fast_review_reasons(document_text, summary_result)
+        if not reasons:
+            self.skip_stage("QualityReviewer", "Summary passed local format validation")
+            if on_summary_delta is not None:
+                on_summary_delta(summary_result)
+            return self.finalize_result(cache_key, chunks, "", summary_result, summary_result, "fast")
+        
+        self.update_agent_status("QualityReviewer", "active", "Reviewing summary quality",
+                                 f"Review needed: {'; '.join(reasons)}")
+        review_messages = self.fast_review_messages(document_text, summary_result)
+        with self.stage_guard("QualityReviewer"):
+            final_summary, first_token, duration, usage = self.timed_call(
+                "QualityReviewer", review_messages, on_summary_delta
+            )
+        self.record_stage_timing("QualityReviewer", first_token, duration)
+        self.record_stage_usage("QualityReviewer", [usage])
+        self.update_agent_status("QualityReviewer", "complete", "Quality review complete",
+                               "Completed final review and provided polished summary")
+        return self.finalize_result(cache_key, chunks, "", summary_result, final_summary, "fast+review")
+    
+    def process_document(self, document_text: str, format_template: str = "",
+                         long_document_mode: bool = None,
+                         on_summary_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Process document through the multi-agent system
+        
+        long_document_mode=None switches to chunked map-reduce analysis automatically
+        once the document exceeds long_document_threshold tokens. When streaming is
+        enabled, on_summary_delta receives the final summary as it is generated.
+        Stages run through the stage graph in agent_registry.STAGE_GRAPHS, each as soon
+        as the stages it depends on are done; with parallel_extraction, three independent
+        extraction stages replace DocumentAnalyzer and run side by side.
+        Raises StageFailedError as soon as a stage fails; later stages are not run.
+        The result's pipeline_path records which route the document took, and
+        critical_path the chain of stages that determined its latency.
+        """
+        
+        chunks, cache_key = self.prepare_document(document_text, format_template, long_document_mode)
+        cached = self.cached_result(cache_key, chunks)
+        if cached is not None:
+            return cached
+        if self.fast_mode and len(chunks) == 1:
+            return self.process_fast(document_text, chunks, cache_key, on_summary_delta)
+        
+        self.skip_unused_stages()
+        outputs = run_graph(self.graph, self.stage_runners(document_text, chunks, on_summary_delta))
+        return self.finalize_graph(cache_key, chunks, outputs)
+
+class AsyncClientSummaryAgents(ClientSummaryAgents):
+    """Asyncio variant of ClientSummaryAgents driven by an AsyncAzureOpenAIWrapper
+    
+    Use one instance per document; instances may share a single wrapper so that many
+    documents are in flight at once. process_document returns the same result dict
+    as the synchronous pipeline.
+    """
+    
+    def __init__(self, azure_client: AsyncAzureOpenAIWrapper, cache: ResultCache = None,
+                 chunk_token_budget: int = 6000, long_document_threshold: int = 12000,
+                 max_parallel_chunks: int = 4, streaming: bool = False, compact: bool = False,
+                 fast_mode: bool = False, fast_review_threshold: int = 3000, telemetry: Telemetry = None,
+                 parallel_extraction: bool = False, router: ModelRouter = None):
+        super().__init__(azure_client, cache, chunk_token_budget, long_document_threshold,
+                         max_parallel_chunks, streaming, compact, fast_mode, fast_review_threshold, telemetry,
+                         parallel_extraction, router)
+    
+    async def timed_call(self, agent_name: str, messages: List[Dict], on_delta: Callable[[str], None] = None):
+        """Run one model call and return (text, time_to_first_token, duration, usage)"""
+        route = self.route_call(agent_name, messages)
+        text, first_token, duration, usage = await self.model_call(agent_name, messages, route, on_delta)
+        retry = self.truncation_retry(agent_name, route, usage, on_delta)
+        if retry is None:
+            return text, first_token, duration, usage
+        text, _, retry_duration, retry_usage = await self.model_call(agent_name, messages, retry)
+        return text, first_token, duration + retry_duration, self.merge_usage(usage, retry_usage)
+    
+    async def model_call(self, agent_name: str, messages: List[Dict], route: Route,
+                         on_delta: Callable[[str], None] = None):
+        """One model call on route; returns (text, time_to_first_token, duration, usage)"""
+        start = time.monotonic()
+        usage = {}
+        if not self.streaming:
+            text = await self.azure_client.generate_response(messages, usage=usage, max_tokens=route.max_tokens,
+                                                             model=route.model)
+            duration = time.monotonic() - start
+            return text, duration, duration, self.log_call_usage(agent_name, self.complete_usage(usage, messages))
+        
+        parts = []
+        first_token = None
+        async for delta in self.azure_client.stream_response(messages, usage=usage, max_tokens=route.max_tokens,
+                                                             model=route.model):
+            if first_token is None:
+                first_token = time.monotonic() - start
+            parts.append(delta)
+            if on_delta is not None:
+                on_delta(delta)
+        duration = time.monotonic() - start
+        first_token = first_token if first_token is not None else duration
+        usage = self.log_call_usage(agent_name, self.complete_usage(usage, messages))
+        return "".join(parts), first_token, duration, usage
+    
+    async def analyze_chunks(self, chunks: List[str]) -> str:
+        """Map step: analyze changed chunks concurrently, then reduce the partial analyses into one input"""
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_chunks))
+        
+        async def analyze(chunk: str):
+            async with semaphore:
+                return await self.timed_call("DocumentAnalyzer", self.analysis_messages(chunk))
+        
+        analyses = self.reusable_analyses(chunks)
+        pending = [idx for idx, analysis in enumerate(analyses) if analysis is None]
+        start = time.monotonic()
+        calls = await asyncio.gather(*(analyze(chunks[idx]) for idx in pending))
+        return self.merge_chunk_analyses(chunks, analyses, pending, calls, start)
+    
+    async def run_model_stage(self, agent_name: str, messages: List[Dict], task: str, done_task: str,
+                              done_message: str, on_delta: Callable[[str], None] = None) -> str:
+        """Run a single-call stage without blocking the event loop"""
+        self.update_agent_status(agent_name, "active", task)
+        with self.stage_guard(agent_name):
+            text, first_token, duration, usage = await self.timed_call(agent_name, messages, on_delta)
+        self.record_stage_timing(agent_name, first_token, duration)
+        self.record_stage_usage(agent_name, [usage])
+        self.update_agent_status(agent_name, "complete", done_task, done_message)
+        return text
+    
+    async def run_analysis(self, document_text: str, chunks: List[str]) -> str:
+        """DocumentAnalyzer stage without blocking the event loop"""
+        if len(chunks) == 1:
+            raw_analysis = await self.run_model_stage(
+                "DocumentAnalyzer", self.analysis_messages(document_text), "Analyzing document structure",
+                "Document analysis complete", "Analyzed document and identified key components"
+            )
+            return self.reduce_analyses([raw_analysis])
+        self.update_agent_status("DocumentAnalyzer", "active",
+                                 f"Analyzing {len(chunks)} document chunks in parallel")
+        with self.stage_guard("DocumentAnalyzer"):
+            analysis_result = await self.analyze_chunks(chunks)
+        self.update_agent_status("DocumentAnalyzer", "complete", "Document analysis complete",
+                                 self.chunk_analysis_message(chunks))
+        return analysis_result
+    
+    async def process_fast(self, document_text: str, chunks: List[str], cache_key: str,
+                           on_summary_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Fast path without blocking the event loop"""
+        for agent_name in ["DocumentAnalyzer", *EXTRACTION_STAGES]:
+            self.skip_stage(agent_name, "Fast path")
+        self.update_agent_status("SummaryGenerator", "active", "Generating summary in a single call")
+        
+        messages = self.fast_messages(document_text)
+        with self.stage_guard("SummaryGenerator"):
+            summary_result, first_token, duration, usage = await self.timed_call("SummaryGenerator", messages)
+        self.record_stage_timing("SummaryGenerator", first_token, duration)
+        self.record_stage_usage("SummaryGenerator", [usage])
+        self.update_agent_status("SummaryGenerator", "complete", "Summary generation complete",
+                               "Generated summary directly from the document")
+        
+        reasons = self.fast_review_reasons(document_text, summary_result)
+        if not reasons:
+            self.skip_stage("QualityReviewer", "Summary passed local format validation")
+            if on_summary_delta is not None:
+                on_summary_delta(summary_result)
+            return self.finalize_result(cache_key, chunks, "", summary_result, summary_result, "fast")
+        
+        self.update_agent_status("QualityReviewer", "active", "Reviewing summary quality",
+                                 f"Review needed: {'; '.join(reasons)}")
+        review_messages = self.fast_review_messages(document_text, summary_result)
+        with self.stage_guard("QualityReviewer"):
+            final_summary, first_token, duration, usage = await self.timed_call(
+                "QualityReviewer", review_messages, on_summary_delta
+            )
+        self.record_stage_timing("QualityReviewer", first_token, duration)
+        self.record_stage_usage("QualityReviewer", [usage])
+        self.update_agent_status("QualityReviewer", "complete", "Quality review complete",
+                               "Completed final review and provided polished summary")
+        return self.finalize_result(cache_key, chunks, "", summary_result, final_summary, "fast+review")
+    
+    async def process_document(self, document_text: str, format_template: str = "",
+                               long_document_mode: bool = None,
+                               on_summary_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """Process document through the multi-agent system without blocking the event loop"""
+        
+        chunks, cache_key = self.prepare_document(document_text, format_template, long_document_mode)
+        cached = self.cached_result(cache_key, chunks)
+        if cached is not None:
+            return cached
+        if self.fast_mode and len(chunks) == 1:
+            return await self.process_fast(document_text, chunks, cache_key, on_summary_delta)
+        
+        self.skip_unused_stages()
+        outputs = await run_graph_async(self.graph, self.stage_runners(document_text, chunks, on_summary_delta))
+        return self.finalize_graph(cache_key, chunks, outputs)
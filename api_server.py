@@ -0,0 +1,323 @@
+"""HTTP job API for submitting documents service-to-service
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8600]
+
+    POST /jobs                    multipart upload: file, plus optional format_template,
+                                  long_document_mode (auto/always/never), fast, compact, parallel, use_cache
+                                  -> 202 with the job ID; 429 with Retry-After when the queue is full
+    GET  /jobs/<id>[?wait=30]     status, and the summary once done; wait long-polls until it finishes
+    GET  /jobs/<id>/export/<fmt>  DOCX or PDF export of a finished summary
+    GET  /health                  queue depth and worker count
+
+Documents run on a JobQueue of this process, so JOB_WORKERS bounds how many reach Azure
+OpenAI at once and JOB_MAX_PENDING bounds how many may wait. The queue, workers and rate
+limiter are not shared with a Streamlit app running alongside; split AZURE_OPENAI_RPM/TPM
+between the two processes so they stay within the deployment's quota together.
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config import (get_setting, load_api_options, load_cache_options, load_cassette_options, load_env_config,
+                    load_job_options, load_pool_options, load_rate_limit_options, load_routing_options,
+                    load_telemetry_options)
+from documents import SUPPORTED_EXTENSIONS
+from exports import EXPORT_FORMATS, export_cache
+from history_store import HistoryStore
+from jobs import DONE, Job, JobQueue, JobRequest, QueueFullError
+from llm_client import get_shared_client
+from result_cache import ResultCache
+from routing import ModelRouter
+from telemetry import Telemetry
+
+logger = logging.getLogger("api_server")
+
+# Longest a GET /jobs/<id>?wait= request is held open
+MAX_WAIT_SECONDS = 60.0
+# Suggested delay before retrying a submission refused because the queue is full
+RETRY_AFTER_SECONDS = 5
+LONG_DOCUMENT_MODES = {"auto": None, "always": True, "never": False}
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """Map each field of a multipart/form-data body to (filename, data); filename is None for plain fields"""
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise ValueError("Expected a multipart/form-data body")
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b"")
+    return fields
+
+
+def job_to_dict(job: Job) -> Dict:
+    """JSON view of a job; finished jobs include the summary and links to their exports"""
+    data = {
+        "id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "filename": job.filename,
+        "submitted_at": job.submitted_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "warnings": [message for _, message in job.notices],
+        "error": job.error,
+    }
+    if job.status == DONE:
+        data["result"] = {
+            "summary": job.result["final_summary"],
+            "client_name": job.client_name,
+            "history_id": job.history_id,
+            "pipeline_path": job.result.get("pipeline_path"),
+            "cache_hit": job.result.get("cache_hit", False),
+            "chunk_count": job.result.get("chunk_count", 1),
+            "reused_chunks": job.result.get("reused_chunks", 0),
+            "critical_path": job.result.get("critical_path", []),
+            "token_usage": job.result.get("token_usage", {}),
+        }
+        data["exports"] = {fmt: f"/jobs/{job.id}/export/{fmt}" for fmt in EXPORT_FORMATS}
+    return data
+
+
+class JobAPIServer:
+    """Threaded HTTP server in front of a JobQueue
+
+    Every job is submitted as `username` with `azure_client`. With a token set, requests
+    must carry `Authorization: Bearer <token>`. Uploads over max_upload_bytes get 413.
+    """
+
+    def __init__(self, job_queue: JobQueue, azure_client, username: str = "api", token: str = None,
+                 host: str = "127.0.0.1", port: int = 8600, max_upload_bytes: int = 50 * 1024 * 1024):
+        self.job_queue = job_queue
+        self.azure_client = azure_client
+        self.username = username
+        self.token = token
+        self.host = host
+        self.port = port
+        self.max_upload_bytes = max_upload_bytes
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def bind(self) -> ThreadingHTTPServer:
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        return self._server
+
+    def start(self) -> "JobAPIServer":
+        threading.Thread(target=self.bind().serve_forever, name="job-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "JobAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, fields: Dict[str, Tuple[Optional[str], bytes]]) -> Job:
+        """Validate an upload's fields and queue the job; raises ValueError or QueueFullError"""
+        filename, data = fields.get("file", (None, b""))
+        if not filename:
+            raise ValueError("The upload needs a 'file' field with a filename")
+        if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {filename}; expected one of {', '.join(SUPPORTED_EXTENSIONS)}")
+
+        def text(name: str, default: str = "") -> str:
+            return fields[name][1].decode("utf-8").strip() if name in fields else default
+
+        mode = text("long_document_mode", "auto").lower()
+        if mode not in LONG_DOCUMENT_MODES:
+            raise ValueError(f"long_document_mode must be one of {', '.join(LONG_DOCUMENT_MODES)}")
+        return self.job_queue.submit(JobRequest(
+            username=self.username,
+            filename=os.path.basename(filename),
+            data=data,
+            azure_client=self.azure_client,
+            format_template=text("format_template"),
+            long_document_mode=LONG_DOCUMENT_MODES[mode],
+            use_cache=text("use_cache", "true").lower() in TRUE_VALUES,
+            agent_options=dict(
+                fast_mode=text("fast").lower() in TRUE_VALUES,
+                compact=text("compact").lower() in TRUE_VALUES,
+                parallel_extraction=text("parallel").lower() in TRUE_VALUES
+            )
+        ))
+
+    def _handler_class(self):
+        server = self
+
+        class JobAPIHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def authorized(self) -> bool:
+                if not server.token:
+                    return True
+                expected = f"Bearer {server.token}"
+                if hmac.compare_digest(self.headers.get("Authorization", "").encode(), expected.encode()):
+                    return True
+                # The body may not have been read, so the connection cannot be reused
+                self.close_connection = True
+                self.send_json(401, {"error": "Missing or invalid bearer token"},
+                               {"WWW-Authenticate": "Bearer"})
+                return False
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                if "Content-Length" not in self.headers:
+                    self.close_connection = True
+                    self.send_json(411, {"error": "Content-Length is required"})
+                    return
+                try:
+                    length = int(self.headers["Content-Length"])
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self.close_connection = True
+                    self.send_json(400, {"error": "Content-Length must be a non-negative integer"})
+                    return
+                if length > server.max_upload_bytes:
+                    self.close_connection = True
+                    self.send_json(413, {"error": f"Uploads are limited to {server.max_upload_bytes} bytes"})
+                    return
+                body = self.rfile.read(length)
+                if urlsplit(self.path).path.rstrip("/") != "/jobs":
+                    self.send_json(404, {"error": "Not found"})
+                    return
+                try:
+                    job = server.submit(parse_multipart(self.headers.get("Content-Type", ""), body))
+                except QueueFullError as e:
+                    self.send_json(429, {"error": f"Queue is full: {e}"},
+                                   {"Retry-After": str(RETRY_AFTER_SECONDS)})
+                    return
+                except (ValueError, UnicodeDecodeError) as e:
+                    self.send_json(400, {"error": str(e)})
+                    return
+                self.send_json(202, job_to_dict(job), {"Location": f"/jobs/{job.id}"})
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                url = urlsplit(self.path)
+                parts = [part for part in url.path.split("/") if part]
+                if parts == ["health"]:
+                    self.send_json(200, {"status": "ok", "pending": server.job_queue.pending(),
+                                         "workers": server.job_queue.workers})
+                    return
+                if len(parts) < 2 or parts[0] != "jobs":
+                    self.send_json(404, {"error": "Not found"})
+                    return
+
+                job_id = parts[1]
+                job = server.job_queue.get(job_id, server.username)
+                if job is None:
+                    self.send_json(404, {"error": f"Unknown job {job_id}"})
+                    return
+                if len(parts) == 2:
+                    try:
+                        wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+                    except ValueError:
+                        self.send_json(400, {"error": "wait must be a number of seconds"})
+                        return
+                    if wait > 0 and not job.finished:
+                        job = server.job_queue.wait(job_id, min(wait, MAX_WAIT_SECONDS)) or job
+                    self.send_json(200, job_to_dict(job))
+                elif len(parts) == 4 and parts[2] == "export" and parts[3] in EXPORT_FORMATS:
+                    self.send_export(job, parts[3])
+                else:
+                    self.send_json(404, {"error": "Not found"})
+
+            def send_export(self, job: Job, fmt: str):
+                if job.status != DONE:
+                    self.send_json(409, {"error": f"Job {job.id} is {job.status}; exports need a finished summary"})
+                    return
+                data = export_cache.render(fmt, job.result["final_summary"], job.filename, job.parsed_summary)
+                stem = os.path.splitext(job.filename)[0]
+                self.send_response(200)
+                self.send_header("Content-Type", EXPORT_FORMATS[fmt][1])
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Content-Disposition", f'attachment; filename="{stem}.summary.{fmt}"')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.info("%s %s", self.address_string(), format % args)
+
+        return JobAPIHandler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    options = load_api_options()
+    parser = argparse.ArgumentParser(description="Serve the summarization pipeline as an HTTP job API")
+    parser.add_argument("--host", default=options['host'], help="Address to bind")
+    parser.add_argument("--port", type=int, default=options['port'], help="Port to listen on")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    azure_config = load_env_config()
+    if not azure_config.get('api_key') or not azure_config.get('endpoint'):
+        logger.error("AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT must be set")
+        return 2
+    azure_client = get_shared_client(**azure_config, **load_rate_limit_options(), **load_cassette_options(),
+                                     **load_pool_options())
+
+    telemetry = Telemetry(**load_telemetry_options())
+    export_cache.telemetry = telemetry
+    job_queue = JobQueue(
+        HistoryStore(get_setting('SUMMARY_HISTORY_DB', '.summary_history.db')),
+        cache=ResultCache(**load_cache_options()),
+        telemetry=telemetry,
+        router=ModelRouter(**load_routing_options()),
+        **load_job_options()
+    )
+    options = dict(load_api_options(), host=args.host, port=args.port)
+    server = JobAPIServer(job_queue, azure_client, **options)
+    httpd = server.bind()
+    logger.info("Job API listening on %s with %d workers", server.endpoint, job_queue.workers)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,19 @@
 import streamlit as st
-import pandas as pd
-import json
-import time
-import io
-from datetime import datetime
-from typing import Dict, List, Any
-import asyncio
-import threading
-from dataclasses import dataclass
-import PyPDF2
-import docx
-from docx import Document
-from docx.shared import Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from datetime import datetime, timedelta
+from typing import Dict, List
 import os
-from openai import AzureOpenAI
-import autogen
-from autogen import ConversableAgent, UserProxyAgent
 import hashlib
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import uuid
+from result_cache import ResultCache
+from routing import ModelRouter
+from history_store import HistoryStore
+from config import (get_setting, load_cache_options, load_cassette_options, load_env_config, load_job_options,
+                    load_pool_options, load_rate_limit_options, load_routing_options, load_telemetry_options)
+from llm_client import get_shared_client
+from agents import AgentStatus
+from exports import EXPORT_FORMATS, export_cache
+from jobs import FAILED, QUEUED, RUNNING, DONE, Job, JobQueue, JobRequest, QueueFullError
+from summary_format import ParsedSummary
+from telemetry import Telemetry
 
 # Page configuration
 st.set_page_config(
@@ -134,6 +125,7 @@ st.markdown("""
     .status-active { background-color: #4CAF50; }
     .status-waiting { background-color: #FF9800; }
     .status-complete { background-color: #2196F3; }
+    .status-failed { background-color: #F44336; }
     
     @keyframes pulse {
         0% { transform: scale(1); }
@@ -154,340 +146,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@dataclass
-class AgentStatus:
-    name: str
-    status: str  # active, waiting, complete
-    current_task: str
-    messages: List[str]
-
-@dataclass
-class ProcessingHistory:
-    id: str
-    timestamp: datetime
-    filename: str
-    client_name: str
-    summary: str
-    full_results: Dict[str, Any]
-
-class DocumentProcessor:
-    """Handles document processing for different file formats"""
-    
-    @staticmethod
-    def extract_text_from_pdf(file) -> str:
-        try:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            st.error(f"Error processing PDF: {str(e)}")
-            return ""
-    
-    @staticmethod
-    def extract_text_from_docx(file) -> str:
-        try:
-            doc = docx.Document(file)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except Exception as e:
-            st.error(f"Error processing DOCX: {str(e)}")
-            return ""
-    
-    @staticmethod
-    def extract_text_from_txt(file) -> str:
-        try:
-            return file.read().decode('utf-8')
-        except Exception as e:
-            st.error(f"Error processing TXT: {str(e)}")
-            return ""
-
-class AzureOpenAIWrapper:
-    """Wrapper for Azure OpenAI to work with AutoGen"""
-    
-    def __init__(self, api_key: str, endpoint: str, api_version: str = "2024-02-15-preview", model: str = "gpt-4"):
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            azure_endpoint=endpoint,
-            api_version=api_version
-        )
-        self.model = model
-    
-    def generate_response(self, messages: List[Dict]) -> str:
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2048
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
-
-class ClientSummaryAgents:
-    """Multi-agent system for client interaction summary generation"""
-    
-    def __init__(self, azure_client: AzureOpenAIWrapper):
-        self.azure_client = azure_client
-        self.agent_statuses = {}
-        self.interaction_log = []
-        self.setup_agents()
-    
-    def setup_agents(self):
-        """Initialize the multi-agent system"""
-        
-        # Document Analyzer Agent
-        self.doc_analyzer = ConversableAgent(
-            name="DocumentAnalyzer",
-            system_message="""You are a Document Analyzer agent. Your role is to:
-            1. Analyze the structure and content of client interaction documents
-            2. Identify key sections, participants, and topics discussed
-            3. Extract relevant information for summary generation
-            4. Pass findings to the Summary Generator agent
-            
-            Be thorough and systematic in your analysis.""",
-            llm_config={"config_list": [{"model": "azure", "api_key": "placeholder"}]},
-            human_input_mode="NEVER"
-        )
-        
-        # Summary Generator Agent
-        self.summary_generator = ConversableAgent(
-            name="SummaryGenerator",
-            system_message="""You are an AI assistant designed to create concise and informative summaries of client interactions for Relationship Managers (RMs). Your task is to analyze the content of a client meeting or call and generate a structured summary.
-
-You MUST use the following exact format for all client interaction summaries (WITHOUT any ** markdown formatting):
-
-Client Interaction Summary
-Date of Meeting: [Insert Date] 
-Participants: [List Participants] 
-Client Name: [Insert Client Name] 
-Meeting Type: [Call/Meeting/Other]
-
-1. Objectives of the Meeting : 
-[Clearly state the purpose and goals of the meeting]
-
-2. Key Discussion Points : 
-[List the main topics, issues, and subjects discussed during the interaction]
-
-3. Decisions Made : 
-[Document any decisions, agreements, or resolutions reached during the meeting]
-
-4. Action Items :
-[List specific action items with responsible for RM and Client separately and timelines where mentioned]
-
-Key Takeaways :
-[Summarize the most important topics in bullet points, outcomes, or next steps from the meeting]
-
-Instructions:
-1. Always use the exact format structure shown above with the same headings but NO ** markdown formatting
-2. Extract relevant information from the document and place it under the appropriate sections
-3. If information for any section is not available in the document, note "[Information not available in document]"
-4. For each section, provide clear, concise information about what was discussed
-5. Highlight any important decisions, action items, or follow-up tasks
-6. Keep the language professional and objective throughout the summary
-7. Ensure the summary is concise while capturing all essential information
-8. If any part of the interaction is unclear or seems to be missing context, note this in the relevant section
-9. DO NOT use any ** formatting or markdown - output clean, plain text with proper headings
-
-Take analyzed document content from the Document Analyzer and create structured, professional summaries following this exact format.""",
-            llm_config={"config_list": [{"model": "azure", "api_key": "placeholder"}]},
-            human_input_mode="NEVER"
-        )
-        
-        # Quality Reviewer Agent
-        self.quality_reviewer = ConversableAgent(
-            name="QualityReviewer",
-            system_message="""You are a Quality Reviewer agent. Your role is to:
-            1. Review summaries generated by the Summary Generator
-            2. Check for completeness, accuracy, and professional tone
-            3. Ensure all key points and action items are captured
-            4. Suggest improvements or approve the final summary
-            5. Provide the final polished summary
-            
-            Be critical but constructive in your review.""",
-            llm_config={"config_list": [{"model": "azure", "api_key": "placeholder"}]},
-            human_input_mode="NEVER"
-        )
-        
-        # Coordinator Agent
-        self.coordinator = UserProxyAgent(
-            name="Coordinator",
-            system_message="You coordinate the summary generation process between agents.",
-            human_input_mode="NEVER",
-            code_execution_config=False
-        )
-        
-        # Initialize agent statuses
-        for agent_name in ["DocumentAnalyzer", "SummaryGenerator", "QualityReviewer", "Coordinator"]:
-            self.agent_statuses[agent_name] = AgentStatus(
-                name=agent_name,
-                status="waiting",
-                current_task="Initialized",
-                messages=[]
-            )
-    
-    def update_agent_status(self, agent_name: str, status: str, task: str, message: str = ""):
-        """Update agent status and log interactions"""
-        if agent_name in self.agent_statuses:
-            self.agent_statuses[agent_name].status = status
-            self.agent_statuses[agent_name].current_task = task
-            if message:
-                self.agent_statuses[agent_name].messages.append(message)
-                self.interaction_log.append({
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                    "agent": agent_name,
-                    "message": message,
-                    "task": task
-                })
-    
-    def process_document(self, document_text: str, format_template: str = "") -> Dict[str, Any]:
-        """Process document through the multi-agent system"""
-        
-        # Step 1: Document Analysis
-        self.update_agent_status("DocumentAnalyzer", "active", "Analyzing document structure")
-        
-        analysis_prompt = f"""
-        Analyze this client interaction document and identify:
-        1. Participants involved
-        2. Main topics discussed
-        3. Key decisions made
-        4. Action items mentioned
-        5. Important dates or deadlines
-        6. Overall meeting context
-        
-        Document content:
-        {document_text}
-        """
-        
-        analysis_messages = [{"role": "user", "content": analysis_prompt}]
-        analysis_result = self.azure_client.generate_response(analysis_messages)
-        
-        self.update_agent_status("DocumentAnalyzer", "complete", "Document analysis complete", 
-                               f"Analyzed document and identified key components")
-        
-        # Step 2: Summary Generation
-        self.update_agent_status("SummaryGenerator", "active", "Generating structured summary")
-        
-        summary_prompt = f"""
-        You are an AI assistant designed to create client interaction summaries for Relationship Managers (RMs).
-        
-        Based on the document analysis provided below, generate a summary using this EXACT format (NO ** markdown formatting):
-
-        Client Interaction Summary
-        Date of Meeting: [Insert Date] 
-        Participants: [List Participants] 
-        Client Name: [Insert Client Name] 
-        Meeting Type: [Call/Meeting/Other]
-
-        1. Objectives of the Meeting :
-        [Clearly state the purpose and goals of the meeting]
-
-        2. Key Discussion Points : 
-        [List the main topics, issues, and subjects discussed during the interaction]
-
-        3. Decisions Made : 
-        [Document any decisions, agreements, or resolutions reached during the meeting]
-
-        4. Action Items :  
-        [List specific action items with responsible for RM and Client separately and timelines where mentioned]
-
-        Key Takeaways : 
-        [Summarize the most important topics in bullet points, outcomes, or next steps from the meeting]
-
-        Document Analysis Results:
-        {analysis_result}
-
-        Original Document Content:
-        {document_text}
-
-        Instructions:
-        - Use the exact format structure shown above with the same headings but NO ** markdown formatting
-        - Extract relevant information and place it under the appropriate sections
-        - If information for any section is not available, note "[Information not available in document]"
-        - Keep language professional and objective
-        - Be concise while capturing all essential information
-        - If any part is unclear or missing context, note this in the relevant section
-        - Output clean, plain text without any ** formatting
-
-        Generate the summary now following this exact format.
-        """
-        
-        summary_messages = [{"role": "user", "content": summary_prompt}]
-        summary_result = self.azure_client.generate_response(summary_messages)
-        
-        self.update_agent_status("SummaryGenerator", "complete", "Summary generation complete",
-                               f"Generated structured summary with required format")
-        
-        # Step 3: Quality Review
-        self.update_agent_status("QualityReviewer", "active", "Reviewing summary quality")
-        
-        review_prompt = f"""
-        You are a Quality Reviewer for client interaction summaries. Review this summary to ensure it follows the exact required format and meets RM standards.
-        
-        Summary to review:
-        {summary_result}
-        
-        Original document:
-        {document_text}
-        
-        Required Format Check:
-        The summary MUST follow this exact structure (WITHOUT ** markdown formatting):
-        
-        Client Interaction Summary
-        Date of Meeting: [Insert Date] 
-        Participants: [List Participants] 
-        Client Name: [Insert Client Name] 
-        Meeting Type: [Call/Meeting/Other]
-        1. Objectives of the Meeting
-        2. Key Discussion Points
-        3. Decisions Made
-        4. Action Items
-        Key Takeaways
-        
-        Verify that the summary:
-        1. Uses the exact format structure with proper headings but NO ** markdown formatting
-        2. Has all required sections present
-        3. Contains relevant information under each section
-        4. Notes "[Information not available in document]" for missing information
-        5. Maintains professional and objective language
-        6. Is concise while capturing essential information
-        7. Notes any unclear parts or missing context in relevant sections
-        8. Does NOT contain any ** formatting - output should be clean plain text
-        
-        Provide the final, polished summary that strictly follows the required format WITHOUT any ** markdown formatting.
-        """
-        
-        review_messages = [{"role": "user", "content": review_prompt}]
-        final_summary = self.azure_client.generate_response(review_messages)
-        
-        self.update_agent_status("QualityReviewer", "complete", "Quality review complete",
-                               f"Completed final review and provided polished summary")
-        
-        return {
-            "analysis": analysis_result,
-            "initial_summary": summary_result,
-            "final_summary": final_summary,
-            "processing_log": self.interaction_log.copy()
-        }
-
 def load_azure_config():
     """Load Azure OpenAI configuration from .env or Streamlit secrets"""
     config = {}
     
     # Try to load from .env file first
     if os.path.exists('.env'):
-        from dotenv import load_dotenv
-        load_dotenv()
-        config = {
-            'api_key': os.getenv('AZURE_OPENAI_API_KEY'),
-            'endpoint': os.getenv('AZURE_OPENAI_ENDPOINT'),
-            'api_version': os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview'),
-            'model': os.getenv('AZURE_OPENAI_MODEL', 'gpt-4')
-        }
+        config = load_env_config('.env')
     else:
         # Fallback to Streamlit secrets
         try:
@@ -502,6 +167,36 @@ def load_azure_config():
     
     return config
 
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Process-wide result cache shared across sessions"""
+    return ResultCache(**load_cache_options())
+
+@st.cache_resource
+def get_history_store() -> HistoryStore:
+    """Process-wide persistent history shared across sessions"""
+    return HistoryStore(get_setting('SUMMARY_HISTORY_DB', '.summary_history.db'))
+
+@st.cache_resource
+def get_telemetry() -> Telemetry:
+    """Process-wide stage timings and token usage, optionally served for Prometheus"""
+    telemetry = Telemetry(**load_telemetry_options())
+    port = int(get_setting('TELEMETRY_PROMETHEUS_PORT', '0'))
+    if port:
+        telemetry.serve_prometheus(port, get_setting('TELEMETRY_PROMETHEUS_HOST', '127.0.0.1'))
+    export_cache.telemetry = telemetry
+    return telemetry
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Process-wide worker pool; jobs keep running across reruns and closed tabs"""
+    return JobQueue(get_history_store(), cache=get_result_cache(), telemetry=get_telemetry(),
+                    router=ModelRouter(**load_routing_options()), **load_job_options())
+
+HISTORY_PAGE_SIZE = 10
+JOB_POLL_SECONDS = 1.0
+JOB_SIDEBAR_LIMIT = 5
+
 def authenticate_user(username: str, password: str) -> bool:
     """Simple authentication function"""
     # Simple hash-based authentication (in production, use proper authentication)
@@ -547,17 +242,41 @@ def display_agent_status(agent_statuses: Dict[str, AgentStatus]):
             status_color = {
                 "active": "status-active",
                 "waiting": "status-waiting", 
-                "complete": "status-complete"
+                "complete": "status-complete",
+                "failed": "status-failed",
+                "skipped": "status-waiting"
             }.get(status.status, "status-waiting")
             
+            timing = ""
+            if status.duration is not None:
+                timing = (f"<p><strong>First token:</strong> {status.time_to_first_token:.1f}s "
+                          f"· <strong>Total:</strong> {status.duration:.1f}s</p>")
+            if status.prompt_tokens is not None:
+                timing += f"<p><strong>Prompt tokens:</strong> {status.prompt_tokens:,}"
+                if status.cached_tokens:
+                    timing += f" ({status.cached_tokens:,} cached)"
+                timing += "</p>"
+            if status.completion_tokens is not None:
+                timing += f"<p><strong>Completion tokens:</strong> {status.completion_tokens:,}</p>"
+            
             st.markdown(f"""
             <div class="agent-card">
                 <h4><span class="status-indicator {status_color}"></span>{agent_name}</h4>
                 <p><strong>Status:</strong> {status.status.title()}</p>
                 <p><strong>Task:</strong> {status.current_task}</p>
+                {timing}
             </div>
             """, unsafe_allow_html=True)
 
+def display_streaming_summary(placeholder, partial_summary: str):
+    """Render the final summary as it streams in"""
+    placeholder.markdown(f"""
+    <div class="summary-output">
+        <h3>📊 Final Client Interaction Summary</h3>
+        {partial_summary.replace(chr(10), '<br>')}▌
+    </div>
+    """, unsafe_allow_html=True)
+
 def display_agent_interactions(interaction_log: List[Dict]):
     """Display agent interactions in real-time"""
     if interaction_log:
@@ -566,12 +285,24 @@ def display_agent_interactions(interaction_log: List[Dict]):
         for interaction in interaction_log[-5:]:  # Show last 5 interactions
             st.markdown(f"""
             <div class="agent-interaction">
-                <p><strong>{interaction['timestamp']} - {interaction['agent']}:</strong></p>
+                <p><strong>{interaction['timestamp']} (+{interaction.get('elapsed', 0):.1f}s) - {interaction['agent']}:</strong></p>
                 <p>{interaction['message']}</p>
                 <small><em>Task: {interaction['task']}</em></small>
             </div>
             """, unsafe_allow_html=True)
 
+def display_telemetry(telemetry: Telemetry):
+    """p50/p95 duration and token totals per pipeline step, with JSON-lines and Prometheus downloads"""
+    summary = telemetry.summary()
+    if not summary:
+        return
+    with st.sidebar.expander("📈 Pipeline Telemetry"):
+        st.table([{"step": step, **values} for step, values in summary.items()])
+        st.download_button("Download events (JSON lines)", data=telemetry.to_jsonl(),
+                           file_name="telemetry.jsonl", mime="application/x-ndjson")
+        st.download_button("Download Prometheus metrics", data=telemetry.to_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+
 def display_processing_step(step_name: str, description: str):
     """Display current processing step"""
     st.markdown(f"""
@@ -581,116 +312,203 @@ def display_processing_step(step_name: str, description: str):
     </div>
     """, unsafe_allow_html=True)
 
-def save_to_history(filename: str, client_name: str, summary: str, full_results: Dict):
-    """Save processing results to history"""
-    if 'processing_history' not in st.session_state:
-        st.session_state.processing_history = []
-    
-    history_item = ProcessingHistory(
-        id=str(uuid.uuid4()),
-        timestamp=datetime.now(),
-        filename=filename,
-        client_name=client_name,
-        summary=summary,
-        full_results=full_results
-    )
+def display_download_buttons(summary: str, filename: str, parsed_summary: ParsedSummary, file_stem: str):
+    """DOCX/PDF download buttons; each file is rendered only when its button is clicked"""
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (fmt, (_, mime)) in zip(columns, EXPORT_FORMATS.items()):
+        with column:
+            st.download_button(
+                f"📄 Download as {fmt.upper()}",
+                # Called on click; repeated downloads of the same summary come from export_cache
+                data=lambda fmt=fmt: export_cache.render(fmt, summary, filename, parsed_summary),
+                file_name=f"{file_stem}.{fmt}",
+                mime=mime
+            )
     
-    st.session_state.processing_history.insert(0, history_item)  # Add to beginning
+    render_times = [
+        f"{fmt.upper()} {timing['last_ms']}ms"
+        for fmt, timing in export_cache.stats().items() if timing['last_ms'] is not None
+    ]
+    if render_times:
+        st.caption(f"Last export render time: {', '.join(render_times)}")
+
+def display_job_notices(job: Job):
+    """Extraction warnings and errors raised while the job ran"""
+    for level, message in job.notices:
+        (st.error if level == "error" else st.warning)(message)
+
+def display_job_progress(job_id: str, show_detailed_logs: bool):
+    """Live view of a running job, polled from a fragment until the job finishes"""
+    job = get_job_queue().get(job_id)
+    if job is None or job.finished:
+        # Full rerun: the result replaces this view and the history sidebar picks up the new entry
+        st.session_state.history_page = 0
+        st.rerun()
+    
+    display_processing_step(job.stage, f"Job {job.id} · {job.filename} · submitted {job.submitted_at.strftime('%H:%M:%S')}")
+    if job.status == QUEUED:
+        st.info(f"⏳ Waiting for a free worker ({get_job_queue().pending()} documents in the queue)")
+    display_job_notices(job)
+    if job.agents is None:
+        if job.extracted_parts:
+            st.caption(f"Extracted {job.extracted_parts} parts so far...")
+            st.text(job.preview + "...")
+        return
+    
+    st.success(f"✅ Successfully extracted {job.document_chars} characters from document")
+    display_agent_status(job.agents.agent_statuses)
+    if job.partial_summary:
+        display_streaming_summary(st.empty(), "".join(job.partial_summary))
+    if show_detailed_logs:
+        display_agent_interactions(job.agents.interaction_log)
+
+def display_job_result(job: Job, show_detailed_logs: bool):
+    """Results of a finished job; it was already saved to history by the worker"""
+    display_job_notices(job)
+    if job.status == FAILED:
+        if job.agents is not None:
+            display_agent_status(job.agents.agent_statuses)
+        st.error(f"❌ {job.error}")
+        return
+    
+    result = job.result
+    st.success(f"✅ Successfully extracted {job.document_chars} characters from document")
+    
+    # Show document preview
+    with st.expander("📖 Document Preview"):
+        st.text(job.preview + "..." if job.document_chars > len(job.preview) else job.preview)
+    
+    # Display final results
+    if result.get('cache_hit'):
+        st.success("🎉 Summary loaded from cache (identical document processed before)")
+    else:
+        st.success("🎉 Summary generation completed!")
+    if result.get('reused_chunks'):
+        st.info(f"📚 Long document mode: re-analyzed {result['chunk_count'] - result['reused_chunks']} of "
+                f"{result['chunk_count']} chunks; the rest were unchanged since an earlier revision")
+    elif result.get('chunk_count', 1) > 1:
+        st.info(f"📚 Long document mode: analyzed {result['chunk_count']} chunks in parallel")
+    path_labels = {
+        "full": "Full pipeline (analysis → summary → review)",
+        "fast": "Fast path (single call, review skipped)",
+        "fast+review": "Fast path with quality review",
+        "incremental": "Incremental (changed chunks re-analyzed → summary → review)",
+        "parallel": "Parallel extraction (details ∥ decisions ∥ action items → summary → review)",
+        "cache": "Result cache"
+    }
+    st.caption(f"Path taken: {path_labels.get(result.get('pipeline_path'), 'Full pipeline')} · Job {job.id}")
+    if result.get('critical_path'):
+        st.caption(f"Critical path: {' → '.join(result['critical_path'])}")
+    if result.get('token_usage'):
+        totals = {key: sum(u.get(key, 0) for u in result['token_usage'].values())
+                  for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens')}
+        st.caption(f"Tokens this document: {totals['prompt_tokens']:,} prompt "
+                   f"({totals['cached_tokens']:,} cached), {totals['completion_tokens']:,} completion")
+    
+    # Final agent status
+    display_agent_status(job.agents.agent_statuses)
+    
+    # Agent interactions
+    if show_detailed_logs:
+        display_agent_interactions(job.agents.interaction_log)
+    
+    # Display final summary
+    st.markdown(f"""
+    <div class="summary-output">
+        <h3>📊 Final Client Interaction Summary</h3>
+        {result['final_summary'].replace(chr(10), '<br>')}
+    </div>
+    """, unsafe_allow_html=True)
     
-    # Keep only last 50 items
-    if len(st.session_state.processing_history) > 50:
-        st.session_state.processing_history = st.session_state.processing_history[:50]
+    # Download options
+    st.subheader("💾 Download Options")
+    display_download_buttons(
+        result['final_summary'],
+        job.filename,
+        job.parsed_summary,
+        f"client_summary_{job.finished_at.strftime('%Y%m%d_%H%M%S')}"
+    )
+
+def display_jobs():
+    """The user's recent jobs in the sidebar; any of them can be reopened"""
+    jobs = get_job_queue().list_jobs(st.session_state.username)[:JOB_SIDEBAR_LIMIT]
+    if not jobs:
+        return
+    st.sidebar.header("⏳ Jobs")
+    icons = {QUEUED: "🕒", RUNNING: "⚙️", DONE: "✅", FAILED: "❌"}
+    for job in jobs:
+        label_col, view_col = st.sidebar.columns([3, 1])
+        label_col.caption(f"{icons[job.status]} {job.filename[:24]} · {job.stage}")
+        if view_col.button("View", key=f"job_{job.id}", disabled=job.id == st.session_state.get('current_job')):
+            st.session_state.current_job = job.id
+            st.session_state.pop('selected_history', None)
+            st.rerun()
+
+def display_history_search(store: HistoryStore, username: str) -> bool:
+    """Search box over past summaries and source documents; returns True while a search is shown"""
+    query = st.sidebar.text_input("🔍 Search summaries", key="history_query",
+                                  placeholder="e.g. rebalancing agreed")
+    if not query.strip():
+        return False
+    
+    with st.sidebar.expander("Filters"):
+        client_filter = st.text_input("Client name", key="history_client_filter")
+        date_range = st.date_input("Date range", value=(), key="history_date_range")
+    date_from = datetime.combine(date_range[0], datetime.min.time()) if len(date_range) > 0 else None
+    # The end date is inclusive, so the bound is midnight after it
+    date_to = datetime.combine(date_range[-1], datetime.min.time()) + timedelta(days=1) if len(date_range) > 1 else None
+    
+    hits = store.search(username, query, client_name=client_filter.strip() or None,
+                        date_from=date_from, date_to=date_to, limit=HISTORY_PAGE_SIZE * 2)
+    if not hits:
+        st.sidebar.info("No matching summaries")
+        return True
+    
+    st.sidebar.caption(f"{len(hits)} best matches")
+    for hit in hits:
+        with st.sidebar.expander(f"📄 {hit.client_name} — {hit.filename[:20]} ({hit.timestamp.strftime('%m/%d %H:%M')})"):
+            st.caption(hit.snippet)
+            st.write(f"**Date:** {hit.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+            if st.button("Load Summary", key=f"search_load_{hit.id}"):
+                st.session_state.selected_history = store.load(username, hit.id)
+                st.rerun()
+    return True
 
 def display_history():
-    """Display processing history in sidebar"""
+    """Display processing history in sidebar, one page of rows at a time"""
     st.sidebar.header("📚 Processing History")
     
-    if 'processing_history' not in st.session_state or not st.session_state.processing_history:
+    store = get_history_store()
+    username = st.session_state.username
+    total = store.count(username)
+    if not total:
         st.sidebar.info("No processing history yet")
         return
     
-    for i, item in enumerate(st.session_state.processing_history[:10]):  # Show last 10
+    if display_history_search(store, username):
+        return
+    
+    pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = min(st.session_state.get('history_page', 0), pages - 1)
+    
+    # Only this page's rows are read, and only their small columns
+    for item in store.list_page(username, offset=page * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE):
         with st.sidebar.expander(f"📄 {item.filename[:20]}... ({item.timestamp.strftime('%m/%d %H:%M')})"):
             st.write(f"**Client:** {item.client_name}")
             st.write(f"**Date:** {item.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-            if st.button(f"Load Summary", key=f"load_{item.id}"):
-                st.session_state.selected_history = item
+            if st.button("Load Summary", key=f"load_{item.id}"):
+                st.session_state.selected_history = store.load(username, item.id)
                 st.rerun()
-
-def create_docx_summary(summary_text: str, filename: str) -> io.BytesIO:
-    """Create a DOCX file from summary text"""
-    doc = Document()
-    
-    # Add title
-    title = doc.add_heading('Client Interaction Summary', 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add content
-    lines = summary_text.split('\n')
-    for line in lines:
-        if line.strip():
-            if line.startswith('**') and line.endswith('**'):
-                # Bold headers
-                p = doc.add_paragraph()
-                run = p.add_run(line.replace('**', ''))
-                run.bold = True
-            else:
-                doc.add_paragraph(line)
-    
-    # Save to BytesIO
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
-
-def create_pdf_summary(summary_text: str, filename: str) -> io.BytesIO:
-    """Create a PDF file from summary text"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        alignment=1,  # Center alignment
-        spaceAfter=30
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceBefore=12,
-        spaceAfter=6
-    )
     
-    content = []
-    content.append(Paragraph("Client Interaction Summary", title_style))
-    content.append(Spacer(1, 12))
-    
-    lines = summary_text.split('\n')
-    for line in lines:
-        if line.strip():
-            if line.startswith('**') and line.endswith('**'):
-                # Bold headers
-                content.append(Paragraph(line.replace('**', ''), header_style))
-            else:
-                content.append(Paragraph(line, styles['Normal']))
-                content.append(Spacer(1, 6))
-    
-    doc.build(content)
-    buffer.seek(0)
-    return buffer
-
-def extract_client_name_from_summary(summary: str) -> str:
-    """Extract client name from summary"""
-    lines = summary.split('\n')
-    for line in lines:
-        if 'Client Name:' in line:
-            return line.split('Client Name:')[-1].strip().replace('[', '').replace(']', '')
-    return "Unknown Client"
+    if pages > 1:
+        prev_col, label_col, next_col = st.sidebar.columns([1, 2, 1])
+        if prev_col.button("◀", key="history_prev", disabled=page == 0):
+            st.session_state.history_page = page - 1
+            st.rerun()
+        label_col.caption(f"Page {page + 1} of {pages} ({total} entries)")
+        if next_col.button("▶", key="history_next", disabled=page >= pages - 1):
+            st.session_state.history_page = page + 1
+            st.rerun()
 
 def main():
     """Main Streamlit application"""
@@ -698,8 +516,8 @@ def main():
     # Initialize session state
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
-    if 'processing_history' not in st.session_state:
-        st.session_state.processing_history = []
+    if 'history_page' not in st.session_state:
+        st.session_state.history_page = 0
     
     # Show login screen if not logged in
     if not st.session_state.logged_in:
@@ -731,10 +549,45 @@ def main():
         st.header("📄 Processing Options")
         show_detailed_logs = st.checkbox("Show Detailed Agent Logs", value=True)
         auto_refresh = st.checkbox("Auto-refresh Agent Status", value=True)
+        bypass_cache = st.checkbox("Bypass Result Cache", value=False,
+                                   help="Always call Azure OpenAI, even for previously processed documents")
+        
+        stream_summary = st.checkbox("Stream Final Summary", value=True,
+                                     help="Show the reviewed summary as it is generated")
+        fast_mode = st.checkbox("Fast Mode (single call)", value=False,
+                                help="Generate the summary in one call and run the Quality Reviewer only "
+                                     "when the format check fails or the document is long")
+        fast_review_threshold = st.number_input(
+            "Always review documents longer than (tokens)",
+            min_value=0, value=3000, step=500,
+            disabled=not fast_mode
+        )
+        compact_prompts = st.checkbox("Compact Prompts", value=False,
+                                      help="Send the full document only to the Document Analyzer; later stages "
+                                           "work from its structured analysis and cited excerpts")
+        parallel_extraction = st.checkbox("Parallel Extraction", value=False,
+                                          help="Extract meeting details, decisions and action items in three "
+                                               "concurrent calls instead of one Document Analyzer call")
+        use_async_engine = st.checkbox("Async Pipeline Engine", value=False,
+                                       help="Run agent calls on the shared asyncio event loop")
+        long_document_choice = st.selectbox(
+            "Long Document Mode",
+            ["Auto", "Always", "Never"],
+            help="Split long transcripts into chunks that are analyzed in parallel"
+        )
+        
+        cache_stats = get_result_cache().stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                   f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024:.0f} KB)")
+        if cache_stats['chunk_hits'] or cache_stats['chunk_misses']:
+            st.caption(f"Chunk analyses: {cache_stats['chunk_hits']} reused / "
+                       f"{cache_stats['chunk_misses']} analyzed")
+        display_telemetry(get_telemetry())
         
         st.markdown("---")
         
-        # Display history
+        # Display jobs and history
+        display_jobs()
         display_history()
     
     # Check if a history item is selected
@@ -751,31 +604,12 @@ def main():
         
         # Download options for historical summary
         st.subheader("💾 Download Historical Summary")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            docx_buffer = create_docx_summary(
-                st.session_state.selected_history.summary, 
-                st.session_state.selected_history.filename
-            )
-            st.download_button(
-                "📄 Download as DOCX",
-                data=docx_buffer.getvalue(),
-                file_name=f"summary_{st.session_state.selected_history.timestamp.strftime('%Y%m%d_%H%M%S')}.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
-        
-        with col2:
-            pdf_buffer = create_pdf_summary(
-                st.session_state.selected_history.summary, 
-                st.session_state.selected_history.filename
-            )
-            st.download_button(
-                "📄 Download as PDF",
-                data=pdf_buffer.getvalue(),
-                file_name=f"summary_{st.session_state.selected_history.timestamp.strftime('%Y%m%d_%H%M%S')}.pdf",
-                mime="application/pdf"
-            )
+        display_download_buttons(
+            st.session_state.selected_history.summary,
+            st.session_state.selected_history.filename,
+            st.session_state.selected_history.parsed_summary,
+            f"summary_{st.session_state.selected_history.timestamp.strftime('%Y%m%d_%H%M%S')}"
+        )
         
         if st.button("🔄 Process New Document"):
             del st.session_state.selected_history
@@ -822,112 +656,62 @@ def main():
         
         # Initialize Azure OpenAI client
         try:
-            azure_client = AzureOpenAIWrapper(
+            azure_client = get_shared_client(
                 api_key=azure_config['api_key'],
                 endpoint=azure_config['endpoint'],
                 api_version=azure_config['api_version'],
-                model=azure_config['model']
+                model=azure_config['model'],
+                async_client=use_async_engine,
+                **load_rate_limit_options(),
+                **load_cassette_options(),
+                **load_pool_options()
             )
         except Exception as e:
             st.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
             st.stop()
         
-        # Initialize the multi-agent system
-        summary_agents = ClientSummaryAgents(azure_client)
-        
-        # Document processing
-        display_processing_step("Document Reading", "Extracting text from uploaded document...")
-        
-        # Extract text based on file type
-        if uploaded_file.type == "application/pdf":
-            document_text = DocumentProcessor.extract_text_from_pdf(uploaded_file)
-        elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            document_text = DocumentProcessor.extract_text_from_docx(uploaded_file)
-        else:
-            document_text = DocumentProcessor.extract_text_from_txt(uploaded_file)
-        
-        if document_text.strip():
-            st.success(f"✅ Successfully extracted {len(document_text)} characters from document")
-            
-            # Show document preview
-            with st.expander("📖 Document Preview"):
-                st.text(document_text[:500] + "..." if len(document_text) > 500 else document_text)
-            
-            # Agent processing
-            display_processing_step("Agent Processing", "Multi-agent system is analyzing and summarizing...")
-            
-            # Create placeholders for dynamic updates
-            status_placeholder = st.empty()
-            interaction_placeholder = st.empty()
-            
-            # Process document through agents
-            with st.spinner("🤖 Agents are working on your document..."):
-                result = summary_agents.process_document(document_text, format_template)
-            
-            # Display final results
-            st.success("🎉 Summary generation completed!")
-            
-            # Final agent status
-            with status_placeholder.container():
-                display_agent_status(summary_agents.agent_statuses)
-            
-            # Agent interactions
-            if show_detailed_logs:
-                with interaction_placeholder.container():
-                    display_agent_interactions(summary_agents.interaction_log)
-            
-            # Extract client name for history
-            client_name = extract_client_name_from_summary(result['final_summary'])
-            
-            # Save to history
-            save_to_history(
+        # Hand the document to the process-wide workers; the job survives reruns and closed tabs
+        try:
+            job = get_job_queue().submit(JobRequest(
+                username=st.session_state.username,
                 filename=uploaded_file.name,
-                client_name=client_name,
-                summary=result['final_summary'],
-                full_results=result
-            )
-            
-            # Display final summary
-            st.markdown(f"""
-            <div class="summary-output">
-                <h3>📊 Final Client Interaction Summary</h3>
-                {result['final_summary'].replace(chr(10), '<br>')}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Download options
-            st.subheader("💾 Download Options")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Create DOCX
-                docx_buffer = create_docx_summary(result['final_summary'], uploaded_file.name)
-                st.download_button(
-                    "📄 Download as DOCX",
-                    data=docx_buffer.getvalue(),
-                    file_name=f"client_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                data=uploaded_file.getvalue(),
+                azure_client=azure_client,
+                format_template=format_template,
+                long_document_mode={"Auto": None, "Always": True, "Never": False}[long_document_choice],
+                use_cache=not bypass_cache,
+                agent_options=dict(
+                    streaming=stream_summary,
+                    compact=compact_prompts,
+                    fast_mode=fast_mode,
+                    parallel_extraction=parallel_extraction,
+                    fast_review_threshold=int(fast_review_threshold)
                 )
-            
-            with col2:
-                # Create PDF
-                pdf_buffer = create_pdf_summary(result['final_summary'], uploaded_file.name)
-                st.download_button(
-                    "📄 Download as PDF",
-                    data=pdf_buffer.getvalue(),
-                    file_name=f"client_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
-        
-        else:
-            st.error("❌ Failed to extract text from the document. Please check the file format and try again.")
+            ))
+        except QueueFullError:
+            st.error("⏳ Too many documents are waiting to be processed. Please try again in a minute.")
+            st.stop()
+        st.session_state.current_job = job.id
+    
+    job = None
+    if st.session_state.get('current_job'):
+        job = get_job_queue().get(st.session_state.current_job, st.session_state.username)
+    if job is not None and not job.finished:
+        # Only this fragment reruns while polling, so the rest of the page stays as it is
+        st.fragment(display_job_progress, run_every=JOB_POLL_SECONDS if auto_refresh else None)(
+            job.id, show_detailed_logs
+        )
+        if not auto_refresh:
+            st.button("🔄 Refresh Status")
+    elif job is not None:
+        display_job_result(job, show_detailed_logs)
     
     # Footer
     st.markdown("---")
     st.markdown("""
     <div style="text-align: center; color: #666;">
-        <p>🔒 Your documents are processed securely and not stored permanently.</p>
+        <p>🔒 Uploaded files are not kept. Summaries, analyses and processing logs are saved on this server
+        in your history and the result cache, and the document text is indexed for history search.</p>
     </div>
     """, unsafe_allow_html=True)
 
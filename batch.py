@@ -0,0 +1,250 @@
+"""Headless batch summarization of a directory of client interaction documents
+
+Usage:
+    python batch.py INPUT_DIR OUTPUT_DIR [--workers 4] [--concurrency 4]
+
+Text extraction runs in a process pool and the agent pipeline runs on the async
+engine with a bounded number of documents in flight. Completed files are recorded
+in OUTPUT_DIR/manifest.jsonl, so rerunning the same command after an interruption
+only processes what is left.
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from agents import AsyncClientSummaryAgents, StageFailedError
+from cassette import open_cassette
+from config import (load_cache_options, load_cassette_options, load_env_config, load_extraction_options,
+                    load_pool_options, load_rate_limit_options, load_routing_options, load_telemetry_options)
+from documents import DocumentProcessor, SUPPORTED_EXTENSIONS
+from exports import create_docx_summary, create_pdf_summary, extract_client_name_from_summary
+from llm_client import AsyncAzureOpenAIWrapper, RateLimiter
+from result_cache import ResultCache
+from routing import ModelRouter
+from summary_format import ParsedSummary, parse_summary
+from telemetry import Telemetry
+
+logger = logging.getLogger("batch")
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def find_documents(input_dir: str, recursive: bool = True) -> List[str]:
+    """Return supported documents under input_dir as paths relative to it, in stable order"""
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        if not recursive:
+            dirs.clear()
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return found
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    """Map relative source path to the content digest of every finished document"""
+    done = {}
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted run; that file is simply redone
+                continue
+            done[record['source']] = record['sha256']
+    return done
+
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_outputs(output_dir: str, relative_path: str, result: Dict, exports: bool,
+                  parsed: ParsedSummary = None) -> List[str]:
+    """Write the summary, full results and optional DOCX/PDF exports for one document"""
+    base = os.path.join(output_dir, relative_path)
+    summary = result['final_summary']
+    outputs = {
+        f"{base}.summary.txt": summary.encode('utf-8'),
+        f"{base}.results.json": json.dumps(result, indent=2).encode('utf-8'),
+    }
+    if exports:
+        outputs[f"{base}.summary.docx"] = create_docx_summary(summary, relative_path, parsed).getvalue()
+        outputs[f"{base}.summary.pdf"] = create_pdf_summary(summary, relative_path, parsed).getvalue()
+    for path, data in outputs.items():
+        write_atomic(path, data)
+    return [os.path.relpath(path, output_dir) for path in outputs]
+
+
+async def run_batch(args, azure_config: Dict[str, str]) -> int:
+    documents = find_documents(args.input_dir, recursive=not args.no_recursive)
+    done = {} if args.force else load_manifest(args.output_dir)
+    digests = {rel: file_digest(os.path.join(args.input_dir, rel)) for rel in documents}
+    pending = [rel for rel in documents if done.get(rel) != digests[rel]]
+    logger.info("Found %d documents, %d already done, %d to process",
+                len(documents), len(documents) - len(pending), len(pending))
+    if not pending:
+        return 0
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    pool_options = load_pool_options()
+    # Keep enough connections open for every document allowed in flight
+    pool_options['max_connections'] = max(pool_options['max_connections'], args.concurrency)
+    rate_limits = load_rate_limit_options()
+    rate_limiter = None
+    if rate_limits['requests_per_minute'] or rate_limits['tokens_per_minute']:
+        rate_limiter = RateLimiter(**rate_limits)
+    azure_client = AsyncAzureOpenAIWrapper(
+        api_key=azure_config['api_key'],
+        endpoint=azure_config['endpoint'],
+        api_version=azure_config['api_version'],
+        model=azure_config['model'],
+        rate_limiter=rate_limiter,
+        cassette=open_cassette(**load_cassette_options()),
+        **pool_options
+    )
+    cache = None if args.no_cache else ResultCache(**load_cache_options())
+    telemetry_options = load_telemetry_options()
+    if args.telemetry:
+        telemetry_options['jsonl_path'] = args.telemetry
+    telemetry = Telemetry(**telemetry_options)
+    router = ModelRouter(**dict(load_routing_options(), fast_model=args.fast_model))
+    # Documents are already spread over the --workers processes, so each one is extracted serially
+    extract = functools.partial(DocumentProcessor.extract_text_from_path,
+                                **dict(load_extraction_options(), workers=1))
+    llm_slots = asyncio.Semaphore(max(1, args.concurrency))
+    manifest_lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    failures = 0
+
+    async def process(pool: ProcessPoolExecutor, relative_path: str):
+        nonlocal failures
+        source = os.path.join(args.input_dir, relative_path)
+        # Includes time spent waiting for a free worker process
+        with telemetry.timer("extraction", source=relative_path) as extraction_fields:
+            text = await loop.run_in_executor(pool, extract, source)
+            extraction_fields["chars"] = len(text)
+        if not text.strip():
+            logger.error("%s: no text extracted", relative_path)
+            failures += 1
+            return
+
+        async with llm_slots:
+            agents = AsyncClientSummaryAgents(azure_client, cache=cache, compact=args.compact,
+                                              fast_mode=args.fast, fast_review_threshold=args.fast_review_threshold,
+                                              telemetry=telemetry, parallel_extraction=args.parallel,
+                                              router=router)
+            try:
+                result = await agents.process_document(text, args.format_template)
+            except StageFailedError as e:
+                logger.error("%s: %s", relative_path, e)
+                failures += 1
+                return
+
+        parsed = parse_summary(result['final_summary'])
+        with telemetry.timer("write_outputs", source=relative_path):
+            written = await loop.run_in_executor(
+                None, write_outputs, args.output_dir, relative_path, result, not args.no_exports, parsed
+            )
+        record = {
+            'source': relative_path,
+            'sha256': digests[relative_path],
+            'client_name': extract_client_name_from_summary(result['final_summary'], parsed),
+            'pipeline_path': result['pipeline_path'],
+            'outputs': written,
+            'completed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        # The manifest line is written last, so an interrupted document is never marked done
+        async with manifest_lock:
+            with open(os.path.join(args.output_dir, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        logger.info("%s: done (%s, %s path)", relative_path, record['client_name'], result['pipeline_path'])
+
+    async def handle(pool: ProcessPoolExecutor, relative_path: str):
+        nonlocal failures
+        # One broken document must not cancel the others running in the gather below
+        try:
+            await process(pool, relative_path)
+        except Exception:
+            logger.exception("%s: failed", relative_path)
+            failures += 1
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        await asyncio.gather(*(handle(pool, rel) for rel in pending))
+
+    logger.info("Finished: %d succeeded, %d failed", len(pending) - failures, failures)
+    for step, values in telemetry.summary().items():
+        logger.info("%s: %d runs, p50 %.0fms, p95 %.0fms, %d prompt / %d cached / %d completion tokens",
+                    step, values['count'], values['p50_ms'], values['p95_ms'],
+                    values['prompt_tokens'], values['cached_tokens'], values['completion_tokens'])
+    return 1 if failures else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Summarize a directory of PDF/DOCX/TXT client interaction documents")
+    parser.add_argument("input_dir", help="Directory containing the documents")
+    parser.add_argument("output_dir", help="Directory for summaries, exports and the resume manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used for text extraction")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum documents in the LLM pipeline at once")
+    parser.add_argument("--format-template", default="", help="Optional custom format template")
+    parser.add_argument("--compact", action="store_true",
+                        help="Send the full document only to the analysis stage")
+    parser.add_argument("--fast", action="store_true",
+                        help="Single-call summaries, reviewed only when validation fails or the document is long")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Extract meeting details, decisions and action items concurrently")
+    parser.add_argument("--fast-model", default=load_routing_options()['fast_model'],
+                        help="Deployment for short analysis and extraction calls (default: AZURE_OPENAI_FAST_MODEL)")
+    parser.add_argument("--fast-review-threshold", type=int, default=3000,
+                        help="With --fast, always review documents longer than this many tokens")
+    parser.add_argument("--no-exports", action="store_true", help="Skip DOCX/PDF exports")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--force", action="store_true", help="Reprocess documents already in the manifest")
+    parser.add_argument("--telemetry", help="Append per-step timing and token events to this JSON-lines file")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not os.path.isdir(args.input_dir):
+        logger.error("Input directory not found: %s", args.input_dir)
+        return 2
+    azure_config = load_env_config()
+    if not all(azure_config.values()):
+        logger.error("Azure OpenAI configuration missing. Set the AZURE_OPENAI_* variables or a .env file.")
+        return 2
+
+    return asyncio.run(run_batch(args, azure_config))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
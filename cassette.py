@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+RECORD = "record"
+REPLAY = "replay"
+MODES = (RECORD, REPLAY)
+
+
+class CassetteMissError(KeyError):
+    """Replay found no recorded response for a request"""
+
+
+@dataclass
+class Recording:
+    """One model response as recorded: text, usage, streamed delta sizes and timing in seconds"""
+    key: str
+    content: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    # Length of each streamed delta, in arrival order; None when the call was not streamed
+    delta_lengths: Optional[List[int]] = None
+    first_token: float = 0.0
+    duration: float = 0.0
+    model: str = ""
+    max_tokens: int = 0
+    recorded_at: float = 0.0
+
+
+def normalize_content(content: str) -> str:
+    """Content with line endings and trailing whitespace normalized, so cosmetic changes still match"""
+    lines = (content or "").replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def request_key(messages: List[Dict], max_tokens: int) -> str:
+    """Key of a chat request: its normalized messages and output limit
+
+    The deployment name is left out, so a cassette recorded against one deployment
+    replays against another.
+    """
+    normalized = [[message["role"], normalize_content(message["content"])] for message in messages]
+    payload = json.dumps({"messages": normalized, "max_tokens": max_tokens}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Request/response pairs for AzureOpenAIWrapper, kept in a gzip JSON-lines file
+
+    In record mode every completed call is appended to the file. In replay mode calls
+    are answered from it without touching the network; identical requests get their
+    recordings in the order they were made, and the last one repeats once they run out.
+    timing_scale replays the recorded latency (1.0 is real time, 0 answers at once).
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, timing_scale: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.timing_scale = timing_scale
+        self.hits = 0
+        self.misses = 0
+        self._recordings = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._recordings = self.load(path)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    @staticmethod
+    def load(path: str) -> Dict[str, List[Recording]]:
+        recordings = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    try:
+                        recording = Recording(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+                    recordings.setdefault(recording.key, []).append(recording)
+            except EOFError:
+                # The last gzip member was cut short by an interrupted recording
+                pass
+        return recordings
+
+    def __len__(self) -> int:
+        return sum(len(recordings) for recordings in self._recordings.values())
+
+    def record(self, messages: List[Dict], max_tokens: int, content: str, usage: Dict[str, int],
+               duration: float, first_token: float = None, deltas: List[str] = None, model: str = ""):
+        """Append one completed call to the cassette file"""
+        recording = Recording(
+            key=request_key(messages, max_tokens), content=content, usage=dict(usage),
+            delta_lengths=[len(delta) for delta in deltas] if deltas is not None else None,
+            first_token=round(duration if first_token is None else first_token, 4), duration=round(duration, 4),
+            model=model, max_tokens=max_tokens, recorded_at=round(time.time(), 3)
+        )
+        with self._lock:
+            self._recordings.setdefault(recording.key, []).append(recording)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending writes a new gzip member per call; gzip readers read them as one stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(recording), ensure_ascii=False) + "\n")
+
+    def replay(self, messages: List[Dict], max_tokens: int) -> Recording:
+        """Return the next recording for this request, or raise CassetteMissError"""
+        key = request_key(messages, max_tokens)
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response in {self.path} for request {key[:12]}")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            self.hits += 1
+            return recordings[min(index, len(recordings) - 1)]
+
+    def paced_deltas(self, recording: Recording) -> Iterator[Tuple[float, str]]:
+        """(delay before it, delta) for each delta of recording, with delays scaled by timing_scale"""
+        deltas = [recording.content]
+        if recording.delta_lengths is not None:
+            deltas, offset = [], 0
+            for length in recording.delta_lengths:
+                deltas.append(recording.content[offset:offset + length])
+                offset += length
+        first = recording.first_token * self.timing_scale
+        rest = max(0.0, recording.duration - recording.first_token) * self.timing_scale
+        for index, delta in enumerate(deltas):
+            yield (first if index == 0 else rest / max(1, len(deltas) - 1)), delta
+
+
+def open_cassette(cassette_path: str = None, cassette_mode: str = REPLAY,
+                  cassette_timing: float = 0.0) -> Optional[Cassette]:
+    """Cassette for the configured path, or None when recording and replay are off"""
+    if not cassette_path:
+        return None
+    return Cassette(cassette_path, cassette_mode, cassette_timing)
@@ -0,0 +1,121 @@
+import hashlib
+import re
+from typing import List
+
+_ENCODING = None
+_ENCODING_LOADED = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use; loading it costs ~100ms at import time"""
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # tiktoken is optional, fall back to a character heuristic
+            _ENCODING = None
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+# Once a chunk holds half its budget, it ends after a block whose hash is divisible by this
+BOUNDARY_DIVISOR = 16
+
+# Lines such as "John Smith:" or "RM (Priya):" that open a new speaker turn
+SPEAKER_TURN = re.compile(r"^\s*[A-Z][\w .'()-]{0,40}:\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens the model will see for text"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English prose
+    return len(text) // 4 + 1
+
+
+def split_into_blocks(text: str) -> List[str]:
+    """Split text into paragraphs, treating each speaker turn as its own block"""
+    blocks = []
+    current = []
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        if current and SPEAKER_TURN.match(line):
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    """Break a single block that exceeds the budget on line, then sentence, boundaries"""
+    pieces = block.splitlines()
+    if len(pieces) == 1:
+        pieces = re.split(r"(?<=[.!?])\s+", block)
+
+    parts = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}\n{piece}" if current else piece
+        if estimate_tokens(candidate) <= max_tokens:
+            current = candidate
+            continue
+        if current:
+            parts.append(current)
+        if estimate_tokens(piece) <= max_tokens:
+            current = piece
+        else:
+            # No natural boundary left, fall back to fixed-size character slices
+            step = max(max_tokens * 4, 1)
+            slices = [piece[i:i + step] for i in range(0, len(piece), step)]
+            parts.extend(slices[:-1])
+            current = slices[-1]
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _is_anchor(block: str) -> bool:
+    digest = hashlib.blake2b(block.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % BOUNDARY_DIVISOR == 0
+
+
+def chunk_text_stable(text: str, max_tokens: int) -> List[str]:
+    """Pack blocks into chunks of at most max_tokens, cutting where the content says to
+
+    Chunks end after an anchor block (see BOUNDARY_DIVISOR) once they hold half the
+    budget, so boundaries depend only on nearby paragraphs. Editing a few paragraphs
+    of a revised document changes the chunks around the edit; the other chunks come
+    out exactly as before.
+    """
+    min_tokens = max_tokens // 2
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in split_into_blocks(text):
+        block_tokens = estimate_tokens(block)
+        if block_tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_split_oversized(block, max_tokens))
+            continue
+        if current and current_tokens + block_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += block_tokens
+        if current_tokens >= min_tokens and _is_anchor(block):
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,132 @@
+import json
+import re
+from typing import Any, Dict, List
+
+from chunking import split_into_blocks
+
+# Fields of the structured analysis produced by DocumentAnalyzer in compact mode
+SCALAR_FIELDS = ["date", "client_name", "meeting_type"]
+LIST_FIELDS = ["participants", "objectives", "discussion_points", "decisions",
+               "key_takeaways", "unclear_points", "evidence"]
+ACTION_OWNERS = ["rm", "client"]
+
+MAX_LIST_ITEMS = 8
+MAX_ITEM_WORDS = 40
+MAX_EXCERPT_CHARS = 600
+
+ANALYSIS_SCHEMA = """{
+  "date": "meeting date or null",
+  "client_name": "client name or null",
+  "meeting_type": "Call, Meeting or Other",
+  "participants": ["name (role)"],
+  "objectives": ["..."],
+  "discussion_points": ["..."],
+  "decisions": ["..."],
+  "action_items": {"rm": ["task - timeline"], "client": ["task - timeline"]},
+  "key_takeaways": ["..."],
+  "unclear_points": ["..."],
+  "evidence": ["short verbatim quote from the document supporting a decision or action item"]
+}"""
+
+
+def _clip(item: Any) -> str:
+    words = str(item).split()
+    if len(words) > MAX_ITEM_WORDS:
+        return " ".join(words[:MAX_ITEM_WORDS]) + " ..."
+    return " ".join(words)
+
+
+def _clip_list(items: Any, max_items: int) -> List[str]:
+    if not isinstance(items, list):
+        items = [items] if items else []
+    clipped = []
+    for item in items:
+        text = _clip(item)
+        if text and text not in clipped:
+            clipped.append(text)
+        if len(clipped) == max_items:
+            break
+    return clipped
+
+
+def bound_analysis(data: Dict[str, Any], max_items: int = MAX_LIST_ITEMS) -> Dict[str, Any]:
+    """Clamp a structured analysis to known fields, max_items per list and MAX_ITEM_WORDS per item"""
+    bounded = {}
+    for field in SCALAR_FIELDS:
+        value = data.get(field)
+        bounded[field] = _clip(value) if value else None
+    for field in LIST_FIELDS:
+        bounded[field] = _clip_list(data.get(field), max_items)
+    action_items = data.get("action_items") or {}
+    if not isinstance(action_items, dict):
+        action_items = {"rm": action_items}
+    bounded["action_items"] = {
+        owner: _clip_list(action_items.get(owner), max_items) for owner in ACTION_OWNERS
+    }
+    return bounded
+
+
+def parse_analysis(raw: str) -> Dict[str, Any]:
+    """Parse the model's JSON analysis, tolerating code fences and surrounding prose"""
+    text = raw.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        data = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        # Keep something usable; the summary stage then works from bounded free text
+        return bound_analysis({"discussion_points": [line for line in raw.splitlines() if line.strip()]})
+    return bound_analysis(data)
+
+
+def merge_analyses(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce per-chunk analyses into one, keeping the first value seen for scalar fields"""
+    merged = {field: None for field in SCALAR_FIELDS}
+    merged.update({field: [] for field in LIST_FIELDS})
+    merged["action_items"] = {owner: [] for owner in ACTION_OWNERS}
+    for analysis in analyses:
+        for field in SCALAR_FIELDS:
+            merged[field] = merged[field] or analysis.get(field)
+        for field in LIST_FIELDS:
+            merged[field].extend(analysis.get(field, []))
+        for owner in ACTION_OWNERS:
+            merged["action_items"][owner].extend(analysis.get("action_items", {}).get(owner, []))
+    # A whole document may carry a little more than one chunk, but stays bounded
+    return bound_analysis(merged, max_items=MAX_LIST_ITEMS * 2)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def select_cited_excerpts(document_text: str, evidence: List[str], max_chars: int = 4000) -> List[str]:
+    """Return the source paragraphs that contain the quotes cited in the analysis
+
+    Quotes that do not occur in the document are dropped, so the reviewer only sees
+    genuine source text.
+    """
+    blocks = [(block, _normalize(block)) for block in split_into_blocks(document_text)]
+    excerpts = []
+    total = 0
+    for quote in evidence:
+        needle = _normalize(quote.rstrip(" ."))
+        if not needle:
+            continue
+        for block, normalized in blocks:
+            position = normalized.find(needle)
+            if position == -1:
+                continue
+            excerpt = block
+            if len(excerpt) > MAX_EXCERPT_CHARS:
+                # Centre a window on the quote; normalization may shift offsets slightly
+                begin = max(0, position - MAX_EXCERPT_CHARS // 2)
+                excerpt = "..." + block[begin:begin + MAX_EXCERPT_CHARS] + "..."
+            if excerpt not in excerpts and total + len(excerpt) <= max_chars:
+                excerpts.append(excerpt)
+                total += len(excerpt)
+            break
+    return excerpts
@@ -0,0 +1,131 @@
+import os
+import threading
+from typing import Dict
+
+_env_file_cache = {}
+_env_file_lock = threading.Lock()
+
+
+def read_env_file(env_file: str) -> Dict[str, str]:
+    """Parse env_file once and reuse the result until its modification time or size changes"""
+    try:
+        stat = os.stat(env_file)
+    except OSError:
+        return {}
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _env_file_lock:
+        cached = _env_file_cache.get(env_file)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        from dotenv import dotenv_values
+        values = {key: value for key, value in dotenv_values(env_file).items() if value is not None}
+        _env_file_cache[env_file] = (signature, values)
+        return values
+
+
+def get_setting(name: str, default: str = None, env_file: str = '.env') -> str:
+    """Value of setting name from the environment, falling back to env_file
+
+    Process environment variables take precedence over the file, as with load_dotenv.
+    The file is parsed once and reread only when it changes (see read_env_file).
+    """
+    if name in os.environ:
+        return os.environ[name]
+    return read_env_file(env_file).get(name, default)
+
+
+def load_env_config(env_file: str = '.env') -> Dict[str, str]:
+    """Load Azure OpenAI configuration from the environment, falling back to env_file"""
+    return {
+        'api_key': get_setting('AZURE_OPENAI_API_KEY', env_file=env_file),
+        'endpoint': get_setting('AZURE_OPENAI_ENDPOINT', env_file=env_file),
+        'api_version': get_setting('AZURE_OPENAI_API_VERSION', '2024-02-15-preview', env_file),
+        'model': get_setting('AZURE_OPENAI_MODEL', 'gpt-4', env_file)
+    }
+
+
+def load_pool_options() -> Dict[str, float]:
+    """HTTP connection pool limits and timeout for the shared Azure OpenAI clients"""
+    return {
+        'max_connections': int(get_setting('AZURE_OPENAI_MAX_CONNECTIONS', '20')),
+        'max_keepalive_connections': int(get_setting('AZURE_OPENAI_MAX_KEEPALIVE', '10')),
+        'timeout': float(get_setting('AZURE_OPENAI_TIMEOUT', '120')),
+    }
+
+
+def load_rate_limit_options() -> Dict[str, int]:
+    """Client-side pacing for the deployment's quota; 0 disables a limit"""
+    return {
+        'requests_per_minute': int(get_setting('AZURE_OPENAI_RPM', '0')),
+        'tokens_per_minute': int(get_setting('AZURE_OPENAI_TPM', '0')),
+    }
+
+
+def load_extraction_options() -> Dict[str, int]:
+    """Page/character budgets and process pool size for document text extraction; 0 disables a budget"""
+    return {
+        'max_pages': int(get_setting('EXTRACT_MAX_PAGES', '500')) or None,
+        'max_chars': int(get_setting('EXTRACT_MAX_CHARS', '1000000')) or None,
+        'workers': int(get_setting('EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        'parallel_min_pages': int(get_setting('EXTRACT_PARALLEL_MIN_PAGES', '50')),
+    }
+
+
+def load_cache_options() -> Dict[str, object]:
+    """On-disk result cache location, size limit and maximum entry age"""
+    return {
+        'cache_dir': get_setting('SUMMARY_CACHE_DIR', '.summary_cache'),
+        'max_bytes': int(get_setting('SUMMARY_CACHE_MAX_MB', '50')) * 1024 * 1024,
+        'max_age_seconds': int(get_setting('SUMMARY_CACHE_MAX_AGE_HOURS', '168')) * 3600,
+    }
+
+
+def load_telemetry_options() -> Dict[str, float]:
+    """Telemetry event log and token prices (per 1K tokens, 0 leaves cost untracked)"""
+    return {
+        'jsonl_path': get_setting('TELEMETRY_JSONL') or None,
+        'prompt_price_per_1k': float(get_setting('TELEMETRY_PROMPT_PRICE_PER_1K', '0')),
+        'cached_price_per_1k': float(get_setting('TELEMETRY_CACHED_PRICE_PER_1K', '0')),
+        'completion_price_per_1k': float(get_setting('TELEMETRY_COMPLETION_PRICE_PER_1K', '0')),
+    }
+
+
+def load_cassette_options() -> Dict[str, str]:
+    """Record/replay cassette for model calls; unset AZURE_OPENAI_CASSETTE turns it off"""
+    return {
+        'cassette_path': get_setting('AZURE_OPENAI_CASSETTE') or None,
+        'cassette_mode': get_setting('AZURE_OPENAI_CASSETTE_MODE', 'replay'),
+        'cassette_timing': float(get_setting('AZURE_OPENAI_CASSETTE_TIMING', '0')),
+    }
+
+
+def load_job_options() -> Dict[str, int]:
+    """Background job workers, the most jobs allowed to wait (0 means no limit) and finished jobs kept"""
+    return {
+        'workers': int(get_setting('JOB_WORKERS', '2')),
+        'max_pending': int(get_setting('JOB_MAX_PENDING', '20')),
+        'retain': int(get_setting('JOB_RETAIN', '200')),
+    }
+
+
+def load_api_options() -> Dict[str, object]:
+    """Address, bearer token, owning username and upload size limit of the HTTP job API"""
+    return {
+        'host': get_setting('JOB_API_HOST', '127.0.0.1'),
+        'port': int(get_setting('JOB_API_PORT', '8600')),
+        'token': get_setting('JOB_API_TOKEN') or None,
+        'username': get_setting('JOB_API_USER', 'api'),
+        'max_upload_bytes': int(get_setting('JOB_API_MAX_UPLOAD_MB', '50')) * 1024 * 1024,
+    }
+
+
+def load_routing_options() -> Dict[str, object]:
+    """Fast deployment for short inputs to the extraction and analysis stages; unset keeps one deployment"""
+    stages = get_setting('AZURE_OPENAI_FAST_STAGES')
+    options = {
+        'fast_model': get_setting('AZURE_OPENAI_FAST_MODEL') or None,
+        'fast_max_input_tokens': int(get_setting('AZURE_OPENAI_FAST_MAX_INPUT_TOKENS', '4000')),
+    }
+    if stages:
+        options['fast_stages'] = tuple(stage.strip() for stage in stages.split(',') if stage.strip())
+    return options
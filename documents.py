@@ -0,0 +1,182 @@
+import io
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters of leading text handed to on_progress, enough for the UI preview
+PREVIEW_CHARS = 500
+# Smallest page range sent to one worker; smaller ranges pay more per-task PDF parsing
+MIN_PAGES_PER_TASK = 8
+
+ProgressCallback = Callable[[int, str], None]
+
+_extraction_pool = None
+_extraction_pool_workers = 0
+_extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the process-wide extraction pool, creating it on first use"""
+    global _extraction_pool, _extraction_pool_workers
+    with _extraction_pool_lock:
+        if _extraction_pool is None or _extraction_pool_workers != workers:
+            if _extraction_pool is not None:
+                _extraction_pool.shutdown(wait=False, cancel_futures=True)
+            # spawn, not fork: the Streamlit server is multi-threaded
+            _extraction_pool = ProcessPoolExecutor(max_workers=workers,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+            _extraction_pool_workers = workers
+        return _extraction_pool
+
+def _extract_pdf_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF; runs in a worker process"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+class DocumentProcessor:
+    """Handles document processing for different file formats"""
+    
+    # Receives a user-facing message when extraction fails; JobQueue routes it to the job being extracted
+    error_handler = logger.error
+    # Receives a message when a page or character budget cuts a document short
+    warning_handler = logger.warning
+    
+    @staticmethod
+    def iter_pdf_pages(file, max_pages: int = None, workers: int = 1,
+                       parallel_min_pages: int = 50) -> Iterator[str]:
+        """Yield the text of each page in order, at most max_pages of them
+    
+        PDFs with at least parallel_min_pages pages are split into page ranges that are
+        extracted in the shared process pool; pages are still yielded in order, as soon
+        as the range holding them is done.
+        """
+        import PyPDF2
+    
+        data = file.read()
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        total = len(reader.pages)
+        if max_pages is not None and total > max_pages:
+            DocumentProcessor.warning_handler(
+                f"PDF has {total} pages; only the first {max_pages} were extracted"
+            )
+            total = max_pages
+    
+        if workers <= 1 or total < parallel_min_pages:
+            for index in range(total):
+                yield reader.pages[index].extract_text() or ""
+            return
+    
+        pool = get_extraction_pool(workers)
+        step = max(MIN_PAGES_PER_TASK, math.ceil(total / (workers * 4)))
+        futures = [pool.submit(_extract_pdf_range, data, start, min(start + step, total))
+                   for start in range(0, total, step)]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            # Stopped early (character budget or an error): drop ranges not yet started
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def iter_docx_paragraphs(file) -> Iterator[str]:
+        """Yield the text of each paragraph in order"""
+        import docx
+    
+        for paragraph in docx.Document(file).paragraphs:
+            yield paragraph.text
+    
+    @staticmethod
+    def collect_text(parts: Iterable[str], max_chars: int = None,
+                     on_progress: Optional[ProgressCallback] = None) -> str:
+        """Join parts, one per line, stopping once max_chars characters are collected
+    
+        on_progress receives the number of parts read so far and the first PREVIEW_CHARS
+        characters of the text, so a preview can be shown before extraction finishes.
+        """
+        pieces = []
+        total = 0
+        preview = ""
+        try:
+            for count, part in enumerate(parts, start=1):
+                piece = part + "\n"
+                if max_chars is not None and total + len(piece) > max_chars:
+                    pieces.append(piece[:max_chars - total])
+                    DocumentProcessor.warning_handler(
+                        f"Document text exceeds {max_chars} characters; the rest was not extracted"
+                    )
+                    break
+                pieces.append(piece)
+                total += len(piece)
+                if on_progress is not None:
+                    if len(preview) < PREVIEW_CHARS:
+                        preview = (preview + piece)[:PREVIEW_CHARS]
+                    on_progress(count, preview)
+        finally:
+            if hasattr(parts, "close"):
+                parts.close()
+        return "".join(pieces)
+    
+    @staticmethod
+    def extract_text_from_pdf(file, max_pages: int = None, max_chars: int = None, workers: int = 1,
+                              parallel_min_pages: int = 50, on_progress: ProgressCallback = None) -> str:
+        try:
+            pages = DocumentProcessor.iter_pdf_pages(file, max_pages, workers, parallel_min_pages)
+            return DocumentProcessor.collect_text(pages, max_chars, on_progress)
+        except Exception as e:
+            DocumentProcessor.error_handler(f"Error processing PDF: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_text_from_docx(file, max_chars: int = None, on_progress: ProgressCallback = None,
+                               **_page_options) -> str:
+        try:
+            paragraphs = DocumentProcessor.iter_docx_paragraphs(file)
+            return DocumentProcessor.collect_text(paragraphs, max_chars, on_progress)
+        except Exception as e:
+            DocumentProcessor.error_handler(f"Error processing DOCX: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_text_from_txt(file, max_chars: int = None, on_progress: ProgressCallback = None,
+                              **_page_options) -> str:
+        try:
+            text = file.read().decode('utf-8')
+            if max_chars is not None and len(text) > max_chars:
+                DocumentProcessor.warning_handler(
+                    f"Document text exceeds {max_chars} characters; the rest was not extracted"
+                )
+                text = text[:max_chars]
+            if on_progress is not None:
+                on_progress(1, text[:PREVIEW_CHARS])
+            return text
+        except Exception as e:
+            DocumentProcessor.error_handler(f"Error processing TXT: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_text_from_path(path: str, **options) -> str:
+        """Extract text from a file on disk, choosing the extractor by extension
+    
+        options (max_pages, max_chars, workers, ...) are passed to the extractor.
+        """
+        extension = os.path.splitext(path)[1].lower()
+        extractor = SUPPORTED_EXTENSIONS.get(extension)
+        if extractor is None:
+            DocumentProcessor.error_handler(f"Unsupported file type: {extension}")
+            return ""
+        with open(path, 'rb') as file:
+            return getattr(DocumentProcessor, extractor)(file, **options)
+
+SUPPORTED_EXTENSIONS = {
+    '.pdf': 'extract_text_from_pdf',
+    '.docx': 'extract_text_from_docx',
+    '.txt': 'extract_text_from_txt',
+}
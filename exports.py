@@ -0,0 +1,197 @@
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict
+from xml.sax.saxutils import escape
+
+from summary_format import HEADER_FIELDS, TITLE, ParsedSummary, parse_summary
+from telemetry import Telemetry
+
+ACTION_ITEM_GROUPS = [
+    ("For RM", "action_items_rm"),
+    ("For Client", "action_items_client"),
+    ("Other", "action_items_other"),
+]
+
+
+def _section_body(parsed: ParsedSummary, section) -> list:
+    """Return (subheading, lines) groups for a section, splitting Action Items by owner"""
+    if section.key != "action_items":
+        return [(None, section.lines)]
+    groups = [(label, getattr(parsed, attr)) for label, attr in ACTION_ITEM_GROUPS]
+    groups = [(label, items) for label, items in groups if items]
+    return groups or [(None, section.lines)]
+
+
+@lru_cache(maxsize=1)
+def _pdf_styles():
+    """Build the PDF stylesheet and custom styles once per process"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        alignment=1,  # Center alignment
+        spaceAfter=30
+    )
+    
+    header_style = ParagraphStyle(
+        'CustomHeader',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceBefore=12,
+        spaceAfter=6
+    )
+    return styles, title_style, header_style
+
+
+def create_docx_summary(summary_text: str, filename: str, parsed: ParsedSummary = None) -> io.BytesIO:
+    """Create a DOCX file from summary text"""
+    # python-docx and reportlab load only when an export is requested
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    
+    parsed = parsed or parse_summary(summary_text)
+    doc = Document()
+    
+    # Add title
+    title = doc.add_heading(TITLE, 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    # Header fields with bold labels
+    for attr, label in HEADER_FIELDS:
+        value = getattr(parsed, attr)
+        if value is not None:
+            p = doc.add_paragraph()
+            p.add_run(f"{label}: ").bold = True
+            p.add_run(value)
+    
+    for line in parsed.preamble:
+        doc.add_paragraph(line)
+    
+    for section in parsed.sections:
+        doc.add_heading(section.heading, level=2)
+        for subheading, lines in _section_body(parsed, section):
+            if subheading:
+                doc.add_paragraph().add_run(f"{subheading}:").bold = True
+            for line in lines:
+                doc.add_paragraph(line)
+    
+    # Save to BytesIO
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def create_pdf_summary(summary_text: str, filename: str, parsed: ParsedSummary = None) -> io.BytesIO:
+    """Create a PDF file from summary text"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    
+    parsed = parsed or parse_summary(summary_text)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles, title_style, header_style = _pdf_styles()
+    
+    content = []
+    content.append(Paragraph(TITLE, title_style))
+    content.append(Spacer(1, 12))
+    
+    # Paragraph text is markup, so model output is escaped before rendering
+    for attr, label in HEADER_FIELDS:
+        value = getattr(parsed, attr)
+        if value is not None:
+            content.append(Paragraph(f"<b>{escape(label)}:</b> {escape(value)}", styles['Normal']))
+            content.append(Spacer(1, 6))
+    
+    for line in parsed.preamble:
+        content.append(Paragraph(escape(line), styles['Normal']))
+        content.append(Spacer(1, 6))
+    
+    for section in parsed.sections:
+        content.append(Paragraph(escape(section.heading), header_style))
+        for subheading, lines in _section_body(parsed, section):
+            if subheading:
+                content.append(Paragraph(f"<b>{escape(subheading)}:</b>", styles['Normal']))
+                content.append(Spacer(1, 6))
+            for line in lines:
+                content.append(Paragraph(escape(line), styles['Normal']))
+                content.append(Spacer(1, 6))
+    
+    doc.build(content)
+    buffer.seek(0)
+    return buffer
+
+def extract_client_name_from_summary(summary: str, parsed: ParsedSummary = None) -> str:
+    """Extract client name from summary"""
+    return (parsed or parse_summary(summary)).display_client_name
+
+EXPORT_FORMATS = {
+    "docx": (create_docx_summary, "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "pdf": (create_pdf_summary, "application/pdf"),
+}
+
+
+class ExportCache:
+    """Bounded LRU of rendered exports keyed by format and summary hash, with render timings"""
+    
+    def __init__(self, max_entries: int = 32, telemetry: Telemetry = None):
+        self.max_entries = max_entries
+        # Receives an export_<fmt> step for every render that missed the cache
+        self.telemetry = telemetry
+        self._entries = OrderedDict()
+        self._timings = {fmt: {"renders": 0, "hits": 0, "last_ms": None, "total_ms": 0.0} for fmt in EXPORT_FORMATS}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(fmt: str, summary_text: str) -> tuple:
+        return fmt, hashlib.sha256(summary_text.encode("utf-8")).hexdigest()
+    
+    def render(self, fmt: str, summary_text: str, filename: str = "", parsed: ParsedSummary = None) -> bytes:
+        """Return the fmt export of summary_text, rendering it only on a cache miss"""
+        key = self.make_key(fmt, summary_text)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._timings[fmt]["hits"] += 1
+                return data
+        
+        create, _ = EXPORT_FORMATS[fmt]
+        start = time.perf_counter()
+        data = create(summary_text, filename, parsed).getvalue()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.telemetry is not None:
+            self.telemetry.record(f"export_{fmt}", elapsed_ms / 1000, bytes=len(data))
+        
+        with self._lock:
+            timing = self._timings[fmt]
+            timing["renders"] += 1
+            timing["last_ms"] = round(elapsed_ms, 1)
+            timing["total_ms"] += elapsed_ms
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Per-format render counts, cache hits and render times in milliseconds"""
+        with self._lock:
+            stats = {}
+            for fmt, timing in self._timings.items():
+                renders = timing["renders"]
+                stats[fmt] = dict(timing, total_ms=round(timing["total_ms"], 1),
+                                  avg_ms=round(timing["total_ms"] / renders, 1) if renders else None)
+            return stats
+
+
+# Shared by every session in the process; exports are small, so a few dozen stay in memory
+export_cache = ExportCache()
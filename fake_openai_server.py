@@ -0,0 +1,239 @@
+"""Local stand-in for an Azure OpenAI chat-completions deployment
+
+Serves POST /openai/deployments/<model>/chat/completions on localhost with a canned,
+well-formed Client Interaction Summary. Latency, output token rate, prompt caching
+and injected failures are configurable, so the pipeline can be measured with no
+network access and no quota.
+
+    with FakeChatCompletionsServer(latency=0.2, tokens_per_second=80) as server:
+        client = AzureOpenAIWrapper(api_key="fake", endpoint=server.endpoint)
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from chunking import estimate_tokens
+
+CANNED_SUMMARY = """Client Interaction Summary
+Date of Meeting: 14 March 2024
+Participants: Relationship Manager, Client CFO, Client Treasurer
+Client Name: Synthetic Holdings Ltd
+Meeting Type: Call
+
+1. Objectives of the Meeting
+Review the current portfolio allocation and agree next steps on the rebalancing proposal.
+
+2. Key Discussion Points
+- Portfolio performance against the benchmark over the last two quarters
+- Exposure to fixed income given the rate outlook
+- Liquidity needs for the planned acquisition
+
+3. Decisions Made
+- The client agreed to the proposed rebalancing towards shorter duration bonds
+- Cash buffer to be raised to cover six months of operating expenses
+
+4. Action Items (for RM and Client)
+For RM:
+- Send the revised allocation proposal by Friday
+For Client:
+- Confirm the liquidity schedule with the treasury team
+
+Key Takeaways
+The client is comfortable with a moderate risk profile and wants quarterly reviews."""
+
+# Azure caches prompt prefixes in 128-token blocks once a prompt reaches 1,024 tokens
+CACHE_BLOCK_TOKENS = 128
+CACHE_MIN_PROMPT_TOKENS = 1024
+# Prefix caching compares prompts in blocks of this many characters (about CACHE_BLOCK_TOKENS tokens)
+CACHE_BLOCK_CHARS = CACHE_BLOCK_TOKENS * 4
+
+
+class FakeChatCompletionsServer:
+    """Threaded HTTP server answering chat-completion requests like an Azure deployment
+
+    latency is the delay before the first token; tokens_per_second paces the rest of
+    the response. error_rate and rate_limit_rate inject 500 and 429 responses (the 429s
+    carry retry-after-ms). cached_fraction of each long prompt is reported as cached;
+    with prefix_caching instead, the cached tokens are the longest prefix shared with an
+    earlier prompt, as with Azure's automatic prompt caching.
+    """
+
+    def __init__(self, latency: float = 0.05, tokens_per_second: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after_ms: int = 50, cached_fraction: float = 0.0,
+                 response_text: str = CANNED_SUMMARY, seed: int = 0, host: str = "127.0.0.1", port: int = 0,
+                 prefix_caching: bool = False):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.cached_fraction = cached_fraction
+        self.response_text = response_text
+        self.prefix_caching = prefix_caching
+        self._seen_prefixes = set()
+        self.host = host
+        self.port = port
+        self.stats = {"requests": 0, "streamed": 0, "errors_injected": 0, "rate_limited": 0,
+                      "deployments": {}}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeChatCompletionsServer":
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeChatCompletionsServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def cached_prefix_tokens(self, messages: List[Dict]) -> int:
+        """Tokens in the longest block-aligned prefix this prompt shares with an earlier one"""
+        prompt = "".join(f"<|{message.get('role')}|>{message.get('content') or ''}" for message in messages)
+        digest = hashlib.sha256()
+        prefixes = []
+        for offset in range(0, len(prompt) - CACHE_BLOCK_CHARS + 1, CACHE_BLOCK_CHARS):
+            digest.update(prompt[offset:offset + CACHE_BLOCK_CHARS].encode("utf-8"))
+            prefixes.append(digest.copy().digest())
+        with self._lock:
+            shared = 0
+            for blocks, prefix in enumerate(prefixes, start=1):
+                if prefix not in self._seen_prefixes:
+                    break
+                shared = blocks
+            self._seen_prefixes.update(prefixes)
+        cached = shared * CACHE_BLOCK_TOKENS
+        return cached if cached >= CACHE_MIN_PROMPT_TOKENS else 0
+
+    def usage(self, messages: List[Dict], completion_tokens: int) -> Dict:
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        cached = 0
+        if self.prefix_caching:
+            cached = min(prompt_tokens, self.cached_prefix_tokens(messages))
+        elif prompt_tokens >= CACHE_MIN_PROMPT_TOKENS:
+            cached = int(prompt_tokens * self.cached_fraction) // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    def _injected_failure(self, path: str):
+        """Return (status, headers) for a failure to inject into this request, or None"""
+        # Azure puts the deployment in the path: /openai/deployments/<name>/chat/completions
+        deployment = path.split("/deployments/")[1].split("/")[0] if "/deployments/" in path else ""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["deployments"][deployment] = self.stats["deployments"].get(deployment, 0) + 1
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429, {"retry-after-ms": str(self.retry_after_ms)}
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors_injected"] += 1
+                return 500, {}
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class ChatCompletionsHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if "/chat/completions" not in self.path:
+                    self.send_json(404, {"error": {"code": "404", "message": "Resource not found"}})
+                    return
+                failure = server._injected_failure(self.path)
+                if failure is not None:
+                    status, headers = failure
+                    self.send_json(status, {"error": {"code": str(status), "message": "Injected failure"}}, headers)
+                    return
+
+                text = server.response_text
+                max_tokens = body.get("max_tokens")
+                if max_tokens:
+                    # Roughly four characters per token, as in chunking.estimate_tokens
+                    text = text[:max_tokens * 4]
+                finish_reason = "length" if len(text) < len(server.response_text) else "stop"
+                completion_tokens = estimate_tokens(text)
+                usage = server.usage(body.get("messages", []), completion_tokens)
+                time.sleep(server.latency)
+                if body.get("stream"):
+                    self.stream(body, text, usage, finish_reason)
+                    return
+                if server.tokens_per_second:
+                    time.sleep(completion_tokens / server.tokens_per_second)
+                self.send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": finish_reason,
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": usage,
+                })
+
+            def stream(self, body: Dict, text: str, usage: Dict, finish_reason: str = "stop"):
+                with server._lock:
+                    server.stats["streamed"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                words = text.split(" ")
+                pieces = [" ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+                          for i in range(0, len(words), 4)]
+                for piece in pieces:
+                    self.send_event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                    if server.tokens_per_second:
+                        time.sleep(estimate_tokens(piece) / server.tokens_per_second)
+                self.send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self.send_event({"choices": [], "usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def send_event(self, payload: Dict):
+                payload = dict({"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                                "created": int(time.time()), "model": "fake"}, **payload)
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            def send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ChatCompletionsHandler
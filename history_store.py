@@ -0,0 +1,234 @@
+import json
+import re
+import sqlite3
+import threading
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from summary_format import ParsedSummary
+
+# Fields at least this large are zlib-compressed on disk
+COMPRESS_THRESHOLD = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    filename TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    summary BLOB NOT NULL,
+    full_results BLOB NOT NULL,
+    parsed_summary BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_time ON history (username, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_history_client ON history (client_name);
+CREATE INDEX IF NOT EXISTS idx_history_time ON history (created_at);
+-- Contentless full-text index keyed by history.rowid; the text itself stays compressed in history
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    summary, source_text, content='', tokenize='porter unicode61'
+);
+"""
+
+# bm25 column weights: a match in the summary ranks above one in the source document
+SEARCH_WEIGHTS = (2.0, 1.0)
+# Characters of summary shown around the first matching term
+SNIPPET_CHARS = 160
+
+_SEARCH_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class ProcessingHistory:
+    id: str
+    timestamp: datetime
+    filename: str
+    client_name: str
+    summary: str
+    full_results: Dict[str, Any]
+    parsed_summary: ParsedSummary = None
+
+
+@dataclass
+class HistoryRow:
+    """The columns the history list shows, without the large fields"""
+    id: str
+    timestamp: datetime
+    filename: str
+    client_name: str
+
+
+@dataclass
+class SearchHit:
+    """A search result, best match first; lower scores rank higher"""
+    id: str
+    timestamp: datetime
+    filename: str
+    client_name: str
+    score: float
+    snippet: str
+
+
+def _pack(text: str) -> bytes:
+    """Encode text for storage, compressing it when large; the first byte marks the encoding"""
+    data = text.encode("utf-8")
+    if len(data) >= COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(data, 6)
+    return b"r" + data
+
+
+def _unpack(blob: bytes) -> str:
+    if blob[:1] == b"z":
+        return zlib.decompress(blob[1:]).decode("utf-8")
+    return blob[1:].decode("utf-8")
+
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix
+
+    Words are quoted so user input never reaches the FTS5 query syntax.
+    """
+    terms = _SEARCH_TERM_PATTERN.findall(query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _snippet(text: str, query: str) -> str:
+    """SNIPPET_CHARS of text around the first query word it contains"""
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in _SEARCH_TERM_PATTERN.findall(query)]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    snippet = " ".join(text[start:start + SNIPPET_CHARS].split())
+    return ("…" if start else "") + snippet + ("…" if start + SNIPPET_CHARS < len(text) else "")
+
+
+class HistoryStore:
+    """Processing history persisted in a local SQLite file, shared by all sessions"""
+
+    def __init__(self, db_path: str = ".summary_history.db"):
+        self.db_path = db_path
+        # One connection shared by Streamlit's script threads, serialized by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            self._index_missing()
+
+    def _index_missing(self):
+        """Index entries written before the search index existed; their source text is not stored"""
+        rows = self._conn.execute(
+            "SELECT rowid, summary FROM history WHERE rowid NOT IN (SELECT rowid FROM history_fts)"
+        ).fetchall()
+        self._conn.executemany(
+            "INSERT INTO history_fts (rowid, summary, source_text) VALUES (?, ?, '')",
+            [(rowid, _unpack(summary)) for rowid, summary in rows]
+        )
+
+    def save(self, username: str, filename: str, client_name: str, summary: str,
+             full_results: Dict[str, Any], parsed_summary: ParsedSummary = None,
+             source_text: str = "") -> ProcessingHistory:
+        """Insert a new entry, index it for search together with source_text, and return it"""
+        entry = ProcessingHistory(
+            id=str(uuid.uuid4()),
+            timestamp=datetime.now(),
+            filename=filename,
+            client_name=client_name,
+            summary=summary,
+            full_results=full_results,
+            parsed_summary=parsed_summary
+        )
+        parsed_blob = _pack(json.dumps(parsed_summary.to_dict())) if parsed_summary is not None else None
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO history (id, username, created_at, filename, client_name, summary, full_results,"
+                " parsed_summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry.id, username, entry.timestamp.timestamp(), filename, client_name,
+                 _pack(summary), _pack(json.dumps(full_results)), parsed_blob)
+            )
+            # Same transaction, so an entry is searchable exactly when it is listed
+            self._conn.execute(
+                "INSERT INTO history_fts (rowid, summary, source_text) VALUES (?, ?, ?)",
+                (cursor.lastrowid, summary, source_text)
+            )
+        return entry
+
+    def count(self, username: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM history WHERE username = ?", (username,)
+            ).fetchone()[0]
+
+    def list_page(self, username: str, offset: int = 0, limit: int = 10) -> List[HistoryRow]:
+        """Newest-first page of entries for username, reading only the small columns"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, filename, client_name FROM history WHERE username = ?"
+                " ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (username, limit, offset)
+            ).fetchall()
+        return [HistoryRow(row[0], datetime.fromtimestamp(row[1]), row[2], row[3]) for row in rows]
+
+    def search(self, username: str, query: str, client_name: str = None, date_from: datetime = None,
+               date_to: datetime = None, limit: int = 20) -> List[SearchHit]:
+        """Rank username's entries matching query in their summary or source text
+
+        client_name matches case-insensitively anywhere in the stored name; date_from and
+        date_to bound the entry time, date_to exclusively.
+        """
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        sql = ("SELECT h.id, h.created_at, h.filename, h.client_name, bm25(history_fts, ?, ?) AS score, h.summary"
+               " FROM history_fts JOIN history h ON h.rowid = history_fts.rowid"
+               " WHERE history_fts MATCH ? AND h.username = ?")
+        params = [*SEARCH_WEIGHTS, expression, username]
+        if client_name:
+            sql += " AND h.client_name LIKE ? ESCAPE '\\'"
+            escaped = client_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if date_from is not None:
+            sql += " AND h.created_at >= ?"
+            params.append(date_from.timestamp())
+        if date_to is not None:
+            sql += " AND h.created_at < ?"
+            params.append(date_to.timestamp())
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            SearchHit(row[0], datetime.fromtimestamp(row[1]), row[2], row[3], row[4], _snippet(_unpack(row[5]), query))
+            for row in rows
+        ]
+
+    def load(self, username: str, entry_id: str) -> Optional[ProcessingHistory]:
+        """Return the full entry, or None if it does not exist or belongs to another user"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, created_at, filename, client_name, summary, full_results, parsed_summary"
+                " FROM history WHERE id = ? AND username = ?",
+                (entry_id, username)
+            ).fetchone()
+        if row is None:
+            return None
+        return ProcessingHistory(
+            id=row[0],
+            timestamp=datetime.fromtimestamp(row[1]),
+            filename=row[2],
+            client_name=row[3],
+            summary=_unpack(row[4]),
+            full_results=json.loads(_unpack(row[5])),
+            parsed_summary=ParsedSummary.from_dict(json.loads(_unpack(row[6]))) if row[6] is not None else None
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
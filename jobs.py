@@ -0,0 +1,232 @@
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents import AsyncClientSummaryAgents, ClientSummaryAgents, StageFailedError
+from config import load_extraction_options
+from documents import DocumentProcessor, SUPPORTED_EXTENSIONS
+from history_store import HistoryStore
+from llm_client import AsyncAzureOpenAIWrapper, run_async
+from result_cache import ResultCache
+from routing import ModelRouter
+from summary_format import ParsedSummary, parse_summary
+from telemetry import Telemetry
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+class QueueFullError(Exception):
+    """The job queue already holds max_pending jobs that have not started"""
+
+
+@dataclass
+class JobRequest:
+    """Everything a worker needs to summarize one uploaded document"""
+    username: str
+    filename: str
+    data: bytes
+    azure_client: Any
+    format_template: str = ""
+    long_document_mode: Optional[bool] = None
+    use_cache: bool = True
+    # Keyword arguments for ClientSummaryAgents: streaming, compact, fast_mode, fast_review_threshold,
+    # parallel_extraction
+    agent_options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Job:
+    """A submitted document and its live state; workers update it while the UI reads it"""
+    id: str
+    username: str
+    filename: str
+    status: str = QUEUED
+    stage: str = "Waiting for a worker"
+    submitted_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    extracted_parts: int = 0
+    preview: str = ""
+    document_chars: int = 0
+    # (level, message) pairs from extraction, e.g. a page budget cutting the document short
+    notices: List[tuple] = field(default_factory=list)
+    agents: Optional[ClientSummaryAgents] = None
+    partial_summary: List[str] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    parsed_summary: Optional[ParsedSummary] = None
+    client_name: str = ""
+    history_id: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+# The job a worker thread is running, so extraction messages reach that job
+_active = threading.local()
+
+
+def _route_to_job(level: str):
+    """Extraction message handler that records the message on the active job, or logs it outside a job"""
+    def handler(message: str):
+        job = getattr(_active, "job", None)
+        if job is None:
+            getattr(logger, level)(message)
+        else:
+            job.notices.append((level, message))
+    return handler
+
+
+class JobQueue:
+    """Process-wide pool of workers running summarization jobs independently of any session
+
+    Jobs outlive the Streamlit rerun or HTTP request that submitted them. Finished
+    results are saved to the history store, so they are kept even if nobody is
+    watching. At most max_pending jobs wait for a worker; submit raises
+    QueueFullError beyond that (0 means no limit). The newest `retain` finished jobs
+    stay available by ID. Every job's agents share `router`.
+    """
+
+    def __init__(self, history_store: HistoryStore, cache: ResultCache = None, telemetry: Telemetry = None,
+                 workers: int = 2, max_pending: int = 0, retain: int = 200, router: ModelRouter = None):
+        self.history_store = history_store
+        self.cache = cache
+        self.telemetry = telemetry
+        self.router = router
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retain = retain
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary-job")
+        # Installed once per queue; the job's notices carry the messages to the UI and the API
+        DocumentProcessor.error_handler = _route_to_job("error")
+        DocumentProcessor.warning_handler = _route_to_job("warning")
+
+    def pending(self) -> int:
+        with self._changed:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def submit(self, request: JobRequest) -> Job:
+        job = Job(id=uuid.uuid4().hex[:12], username=request.username, filename=request.filename)
+        with self._changed:
+            if self.max_pending and sum(1 for queued in self._jobs.values() if queued.status == QUEUED) >= self.max_pending:
+                raise QueueFullError(f"{self.max_pending} jobs are already waiting")
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._executor.submit(self._run, job, request)
+        return job
+
+    def get(self, job_id: str, username: str = None) -> Optional[Job]:
+        """The job with this ID, or None if unknown, evicted or owned by another user"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+        if job is None or (username is not None and job.username != username):
+            return None
+        return job
+
+    def list_jobs(self, username: str) -> List[Job]:
+        """username's jobs still in memory, newest first"""
+        with self._changed:
+            return [job for job in reversed(self._jobs.values()) if job.username == username]
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Block until the job finishes or timeout seconds pass, then return it"""
+        with self._changed:
+            self._changed.wait_for(lambda: job_id not in self._jobs or self._jobs[job_id].finished, timeout)
+            return self._jobs.get(job_id)
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retain)]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: Job, status: str, error: str = None):
+        with self._changed:
+            job.error = error
+            job.status = status
+            job.finished_at = datetime.now()
+            self._changed.notify_all()
+
+    def _run(self, job: Job, request: JobRequest):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        _active.job = job
+        try:
+            text = self._extract(job, request)
+            if not text.strip():
+                self._finish(job, FAILED, "No text could be extracted from the document")
+                return
+            self._summarize(job, request, text)
+        except StageFailedError as e:
+            self._finish(job, FAILED, f"{e}. The remaining stages were skipped; please try again.")
+        except ValueError as e:
+            self._finish(job, FAILED, str(e))
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            self._finish(job, FAILED, str(e))
+        finally:
+            _active.job = None
+
+    def _extract(self, job: Job, request: JobRequest) -> str:
+        job.stage = "Extracting text"
+        extension = os.path.splitext(request.filename)[1].lower()
+        extractor = SUPPORTED_EXTENSIONS.get(extension)
+        if extractor is None:
+            raise ValueError(f"Unsupported file type: {extension or request.filename}")
+
+        def on_progress(parts_read: int, preview: str):
+            job.extracted_parts = parts_read
+            job.preview = preview
+
+        options = dict(load_extraction_options(), on_progress=on_progress)
+        if self.telemetry is None:
+            text = getattr(DocumentProcessor, extractor)(io.BytesIO(request.data), **options)
+        else:
+            with self.telemetry.timer("extraction", extension=extension) as fields:
+                text = getattr(DocumentProcessor, extractor)(io.BytesIO(request.data), **options)
+                fields["chars"] = len(text)
+        job.document_chars = len(text)
+        return text
+
+    def _summarize(self, job: Job, request: JobRequest, text: str):
+        job.stage = "Running agents"
+        is_async = isinstance(request.azure_client, AsyncAzureOpenAIWrapper)
+        agents_class = AsyncClientSummaryAgents if is_async else ClientSummaryAgents
+        job.agents = agents_class(request.azure_client, cache=self.cache if request.use_cache else None,
+                                  telemetry=self.telemetry, router=self.router, **request.agent_options)
+        process = job.agents.process_document(text, request.format_template,
+                                              long_document_mode=request.long_document_mode,
+                                              on_summary_delta=job.partial_summary.append)
+        result = run_async(process) if is_async else process
+
+        job.stage = "Saving to history"
+        job.parsed_summary = parse_summary(result['final_summary'])
+        job.client_name = job.parsed_summary.display_client_name
+        entry = self.history_store.save(
+            username=job.username,
+            filename=job.filename,
+            client_name=job.client_name,
+            summary=result['final_summary'],
+            full_results=result,
+            parsed_summary=job.parsed_summary,
+            source_text=text
+        )
+        job.history_id = entry.id
+        job.result = result
+        job.stage = "Complete"
+        self._finish(job, DONE)
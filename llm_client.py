@@ -0,0 +1,495 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from cassette import Cassette, CassetteMissError, Recording, open_cassette
+from chunking import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_TIMEOUT = 120.0
+MAX_OUTPUT_TOKENS = 2048
+
+class LLMError(Exception):
+    """A model call that failed, after any retries"""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class LLMRateLimitError(LLMError):
+    """The deployment kept answering 429 Too Many Requests"""
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Read Retry-After (or Azure's retry-after-ms) from an HTTP response"""
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date form of Retry-After; fall back to normal backoff
+        return None
+    return None
+
+def classify_error(error: Exception) -> LLMError:
+    """Map an OpenAI SDK exception onto a typed LLMError"""
+    if isinstance(error, LLMError):
+        return error
+    import openai
+    
+    if isinstance(error, openai.RateLimitError):
+        return LLMRateLimitError(str(error), status_code=429, retryable=True,
+                                 retry_after=_retry_after_seconds(error.response))
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return LLMError(str(error), retryable=True)
+    if isinstance(error, openai.APIStatusError):
+        status_code = error.status_code
+        retryable = status_code in (408, 409) or status_code >= 500
+        return LLMError(str(error), status_code=status_code, retryable=retryable,
+                        retry_after=_retry_after_seconds(error.response))
+    return LLMError(str(error))
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, honoring Retry-After when the server sends it"""
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class RateLimiter:
+    """Token-bucket limiter sized to a deployment's requests- and tokens-per-minute quota
+    
+    A limit of 0 disables that bucket. Callers reserve capacity up front and then wait
+    out any deficit, so concurrent callers queue fairly without holding the lock.
+    """
+    
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens: int) -> float:
+        """Book one request and tokens, returning how long the caller must wait first"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = max(0.0, self._paused_until - now)
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * rate) - 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests / rate)
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60
+                tokens = min(tokens, self.tokens_per_minute)
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate) - tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / rate)
+            return wait
+    
+    def pause(self, seconds: float):
+        """Hold back every caller, e.g. after the server answered 429 with Retry-After"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def acquire(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def usage_to_dict(usage) -> Dict[str, int]:
+    """Prompt, completion and cached prompt token counts from a usage payload"""
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    }
+
+def flag_truncation(call_usage: Dict[str, int], finish_reason: Optional[str], max_tokens: int) -> bool:
+    """Mark call_usage as truncated when the reply stopped at max_tokens; returns whether it did"""
+    if finish_reason != "length":
+        return False
+    logger.warning("Completion stopped at max_tokens=%d; the reply is truncated", max_tokens)
+    call_usage["truncated"] = 1
+    return True
+
+def supports_stream_usage(api_version: str) -> bool:
+    """stream_options.include_usage is only accepted from API version 2024-09-01 onwards"""
+    return api_version[:10] >= "2024-09-01"
+
+def replay_recording(cassette: Cassette, messages: List[Dict], max_tokens: int) -> Recording:
+    """The cassette's next recording for this request; a miss fails the call like an API error"""
+    try:
+        return cassette.replay(messages, max_tokens)
+    except CassetteMissError as e:
+        raise LLMError(str(e.args[0])) from e
+
+def estimate_request_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Tokens a request counts against the TPM quota: the prompt plus the output budget"""
+    return sum(estimate_tokens(message["content"]) for message in messages) + max_tokens
+
+class AzureOpenAIWrapper:
+    """Wrapper for Azure OpenAI to work with AutoGen
+    
+    Calls are retried according to retry_policy and paced by an optional RateLimiter.
+    Failures raise LLMError instead of returning error text. With a cassette, calls are
+    recorded to it or, in replay mode, served from it.
+    """
+    
+    def __init__(self, api_key: str, endpoint: str, api_version: str = "2024-02-15-preview", model: str = "gpt-4",
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                 timeout: float = DEFAULT_TIMEOUT, retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None, cassette: Cassette = None):
+        # The SDK is imported on first use so the UI can render before it loads
+        import httpx
+        from openai import AzureOpenAI
+        
+        self.client = AzureOpenAI(
+            api_key=api_key,
+            azure_endpoint=endpoint,
+            api_version=api_version,
+            timeout=timeout,
+            # Retries are handled here so they can share the rate limiter
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections),
+                timeout=timeout
+            )
+        )
+        self.model = model
+        self.endpoint = endpoint
+        self.api_version = api_version
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        # Records every call, or answers calls from recordings without the network
+        self.cassette = cassette
+    
+    def _create(self, messages: List[Dict], max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None, **kwargs):
+        """Call chat.completions.create with rate limiting and retries"""
+        rate_limiter = deployment_rate_limiter(self, model)
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire(estimate_request_tokens(messages, max_tokens))
+            try:
+                return self.client.chat.completions.create(
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
+            except Exception as e:
+                error = classify_error(e)
+                if not error.retryable or attempt == self.retry_policy.max_attempts:
+                    raise error from e
+                delay = self.retry_policy.delay(attempt, error.retry_after)
+                if error.retry_after is not None and rate_limiter is not None:
+                    rate_limiter.pause(delay)
+                time.sleep(delay)
+    
+    def generate_response(self, messages: List[Dict], usage: Dict = None,
+                          max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None) -> str:
+        """Return the completion text; token counts are written into usage when given
+        
+        model names another deployment on the same endpoint for this call only. Such calls
+        are paced by that deployment's own rate limiter (see deployment_rate_limiter).
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            recording = replay_recording(self.cassette, messages, max_tokens)
+            time.sleep(recording.duration * self.cassette.timing_scale)
+            if usage is not None:
+                usage.update(recording.usage)
+            return recording.content
+        
+        start = time.monotonic()
+        response = self._create(messages, max_tokens=max_tokens, model=model)
+        call_usage = usage_to_dict(response.usage)
+        flag_truncation(call_usage, response.choices[0].finish_reason, max_tokens)
+        if usage is not None:
+            usage.update(call_usage)
+        text = response.choices[0].message.content
+        if self.cassette is not None:
+            self.cassette.record(messages, max_tokens, text or "", call_usage, time.monotonic() - start,
+                                 model=model or self.model)
+        return text
+    
+    def stream_response(self, messages: List[Dict], usage: Dict = None,
+                        max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None) -> Iterator[str]:
+        """Yield content deltas as the model produces them (stream=True)
+        
+        Only opening the stream is retried; a failure after deltas were yielded raises LLMError.
+        usage is filled from the final chunk when the API version reports streaming usage.
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            recording = replay_recording(self.cassette, messages, max_tokens)
+            for delay, delta in self.cassette.paced_deltas(recording):
+                time.sleep(delay)
+                yield delta
+            if usage is not None:
+                usage.update(recording.usage)
+            return
+        
+        options = {"stream_options": {"include_usage": True}} if supports_stream_usage(self.api_version) else {}
+        start = time.monotonic()
+        stream = self._create(messages, max_tokens=max_tokens, model=model, stream=True, **options)
+        deltas, first_token, call_usage, finish_reason = [], None, {}, None
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    call_usage = usage_to_dict(chunk.usage)
+                    if usage is not None:
+                        usage.update(call_usage)
+                # Azure sends prompt filter results as chunks without choices
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    deltas.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise classify_error(e) from e
+        if flag_truncation(call_usage, finish_reason, max_tokens) and usage is not None:
+            usage.update(call_usage)
+        if self.cassette is not None:
+            self.cassette.record(messages, max_tokens, "".join(deltas), call_usage, time.monotonic() - start,
+                                 first_token, deltas, model or self.model)
+
+class AsyncAzureOpenAIWrapper:
+    """Asyncio counterpart of AzureOpenAIWrapper backed by AsyncAzureOpenAI
+    
+    One instance can serve many documents concurrently over the same connection pool,
+    as long as every call runs on the shared event loop (see run_async).
+    """
+    
+    def __init__(self, api_key: str, endpoint: str, api_version: str = "2024-02-15-preview", model: str = "gpt-4",
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                 timeout: float = DEFAULT_TIMEOUT, retry_policy: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None, cassette: Cassette = None):
+        import httpx
+        from openai import AsyncAzureOpenAI
+        
+        self.client = AsyncAzureOpenAI(
+            api_key=api_key,
+            azure_endpoint=endpoint,
+            api_version=api_version,
+            timeout=timeout,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections),
+                timeout=timeout
+            )
+        )
+        self.model = model
+        self.endpoint = endpoint
+        self.api_version = api_version
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        # Records every call, or answers calls from recordings without the network
+        self.cassette = cassette
+    
+    async def _create(self, messages: List[Dict], max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None, **kwargs):
+        """Call chat.completions.create with rate limiting and retries"""
+        rate_limiter = deployment_rate_limiter(self, model)
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async(estimate_request_tokens(messages, max_tokens))
+            try:
+                return await self.client.chat.completions.create(
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
+            except Exception as e:
+                error = classify_error(e)
+                if not error.retryable or attempt == self.retry_policy.max_attempts:
+                    raise error from e
+                delay = self.retry_policy.delay(attempt, error.retry_after)
+                if error.retry_after is not None and rate_limiter is not None:
+                    rate_limiter.pause(delay)
+                await asyncio.sleep(delay)
+    
+    async def generate_response(self, messages: List[Dict], usage: Dict = None,
+                                max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None) -> str:
+        """Return the completion text; token counts are written into usage when given"""
+        if self.cassette is not None and self.cassette.replaying:
+            recording = replay_recording(self.cassette, messages, max_tokens)
+            await asyncio.sleep(recording.duration * self.cassette.timing_scale)
+            if usage is not None:
+                usage.update(recording.usage)
+            return recording.content
+        
+        start = time.monotonic()
+        response = await self._create(messages, max_tokens=max_tokens, model=model)
+        call_usage = usage_to_dict(response.usage)
+        flag_truncation(call_usage, response.choices[0].finish_reason, max_tokens)
+        if usage is not None:
+            usage.update(call_usage)
+        text = response.choices[0].message.content
+        if self.cassette is not None:
+            self.cassette.record(messages, max_tokens, text or "", call_usage, time.monotonic() - start,
+                                 model=model or self.model)
+        return text
+    
+    async def stream_response(self, messages: List[Dict], usage: Dict = None,
+                              max_tokens: int = MAX_OUTPUT_TOKENS, model: str = None) -> AsyncIterator[str]:
+        """Yield content deltas as the model produces them (stream=True)"""
+        if self.cassette is not None and self.cassette.replaying:
+            recording = replay_recording(self.cassette, messages, max_tokens)
+            for delay, delta in self.cassette.paced_deltas(recording):
+                await asyncio.sleep(delay)
+                yield delta
+            if usage is not None:
+                usage.update(recording.usage)
+            return
+        
+        options = {"stream_options": {"include_usage": True}} if supports_stream_usage(self.api_version) else {}
+        start = time.monotonic()
+        stream = await self._create(messages, max_tokens=max_tokens, model=model, stream=True, **options)
+        deltas, first_token, call_usage, finish_reason = [], None, {}, None
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    call_usage = usage_to_dict(chunk.usage)
+                    if usage is not None:
+                        usage.update(call_usage)
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    deltas.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise classify_error(e) from e
+        if flag_truncation(call_usage, finish_reason, max_tokens) and usage is not None:
+            usage.update(call_usage)
+        if self.cassette is not None:
+            self.cassette.record(messages, max_tokens, "".join(deltas), call_usage, time.monotonic() - start,
+                                 first_token, deltas, model or self.model)
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+def get_shared_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its background thread on first use"""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None or _shared_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="summary-event-loop", daemon=True).start()
+            _shared_loop = loop
+        return _shared_loop
+
+def submit_async(coro) -> concurrent.futures.Future:
+    """Schedule a coroutine on the shared event loop and return a thread-safe future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_event_loop())
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and block the calling thread until it finishes"""
+    return submit_async(coro).result()
+
+_shared_clients = {}
+_rate_limiters = {}
+_cassettes = {}
+_shared_clients_lock = threading.Lock()
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(endpoint: str, model: str, requests_per_minute: int = 0,
+                     tokens_per_minute: int = 0) -> RateLimiter:
+    """Process-wide RateLimiter of one deployment; the limits only apply when it is first created"""
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get((endpoint, model))
+        if rate_limiter is None:
+            rate_limiter = _rate_limiters[(endpoint, model)] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return rate_limiter
+
+def deployment_rate_limiter(client, model: str = None) -> Optional[RateLimiter]:
+    """Rate limiter for a call by client to deployment model
+    
+    Each deployment has its own quota, so a call routed to another deployment is paced
+    by that deployment's limiter, sized like the client's own (AZURE_OPENAI_RPM/TPM).
+    """
+    if client.rate_limiter is None or not model or model == client.model:
+        return client.rate_limiter
+    return get_rate_limiter(client.endpoint, model, client.rate_limiter.requests_per_minute,
+                            client.rate_limiter.tokens_per_minute)
+
+def get_shared_client(api_key: str, endpoint: str, api_version: str = "2024-02-15-preview", model: str = "gpt-4",
+                      async_client: bool = False, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                      cassette_path: str = None, cassette_mode: str = "replay", cassette_timing: float = 0.0,
+                      **pool_options):
+    """Return the process-wide wrapper for (endpoint, api_version, deployment)
+    
+    Wrappers are stateless between calls, so one keep-alive connection pool is shared
+    by every session and rerun. pool_options (max_connections, max_keepalive_connections,
+    timeout) only apply when the client is first created. Async clients must only be
+    used on the shared event loop. Sync and async clients of one deployment share a
+    RateLimiter, because the RPM/TPM quota belongs to the deployment. With cassette_path
+    set, calls are recorded to or replayed from that cassette (see cassette.Cassette).
+    """
+    key = (
+        endpoint,
+        api_version,
+        model,
+        async_client,
+        cassette_path,
+        cassette_mode,
+        # A rotated key gets a fresh client instead of reusing the old credentials
+        hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    )
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            rate_limiter = None
+            if requests_per_minute or tokens_per_minute:
+                rate_limiter = get_rate_limiter(endpoint, model, requests_per_minute, tokens_per_minute)
+            cassette = None
+            if cassette_path:
+                cassette = _cassettes.get((cassette_path, cassette_mode))
+                if cassette is None:
+                    cassette = open_cassette(cassette_path, cassette_mode, cassette_timing)
+                    _cassettes[(cassette_path, cassette_mode)] = cassette
+            wrapper_class = AsyncAzureOpenAIWrapper if async_client else AzureOpenAIWrapper
+            client = wrapper_class(api_key, endpoint, api_version, model, rate_limiter=rate_limiter,
+                                   cassette=cassette, **pool_options)
+            _shared_clients[key] = client
+        return client
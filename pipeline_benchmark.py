@@ -0,0 +1,314 @@
+"""Offline pipeline benchmark against a local Azure OpenAI stand-in
+
+Usage:
+    python pipeline_benchmark.py [--sizes small:1500,medium:8000,large:30000] [--formats txt,docx,pdf]
+                                 [--latency 0.05] [--tokens-per-second 0] [--error-rate 0]
+                                 [--concurrency 1] [--baseline benchmark_baseline.json] [--update-baseline]
+    python pipeline_benchmark.py --documents notes/ --cassette production.cassette [--cassette-timing 1.0]
+
+A synthetic corpus of meeting transcripts (one per size and format) is written to
+--corpus-dir once and reused. Every document is extracted with DocumentProcessor,
+summarized with ClientSummaryAgents.process_document against fake_openai_server,
+and exported to DOCX and PDF. The report gives throughput, p50/p95 latency per
+step and peak memory. With --baseline, the run is compared against a stored
+report and the benchmark fails when a metric regresses beyond --tolerance.
+
+With --documents and --cassette, real documents are processed and the model calls
+are replayed from a cassette recorded in production (AZURE_OPENAI_CASSETTE_MODE=record),
+so everything around the model is measured against real inputs and outputs.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from agents import ClientSummaryAgents, StageFailedError
+from batch import find_documents
+from cassette import REPLAY, Cassette
+from config import load_extraction_options
+from documents import DocumentProcessor
+from exports import EXPORT_FORMATS
+from fake_openai_server import CANNED_SUMMARY, FakeChatCompletionsServer
+from llm_client import AzureOpenAIWrapper, RetryPolicy
+from routing import ModelRouter
+from summary_format import parse_summary
+from telemetry import Telemetry
+
+DEFAULT_SIZES = "small:1500,medium:8000,large:30000"
+DEFAULT_FORMATS = "txt,docx,pdf"
+# Timing differences below this many milliseconds are noise, whatever the ratio
+MIN_REGRESSION_MS = 5.0
+
+SPEAKERS = ["RM", "Client CFO", "Client Treasurer", "Portfolio Specialist"]
+TOPICS = [
+    "the rebalancing proposal", "duration risk in the bond sleeve", "the liquidity schedule",
+    "quarterly performance against the benchmark", "the acquisition financing", "currency hedging",
+    "the pension scheme contributions", "fees on the discretionary mandate", "the ESG screening policy",
+]
+FILLER = ("we", "should", "look", "at", "the", "numbers", "again", "before", "next", "week", "and",
+          "confirm", "whether", "that", "still", "works", "for", "the", "board", "given", "current", "rates")
+
+
+def synthetic_transcript(words: int, seed: int) -> List[str]:
+    """Deterministic meeting transcript of about words words, one speaker turn per line"""
+    rng = random.Random(seed)
+    lines = ["Meeting transcript - Synthetic Holdings Ltd quarterly review", ""]
+    count = 0
+    while count < words:
+        turn = [f"On {rng.choice(TOPICS)},"] + [rng.choice(FILLER) for _ in range(rng.randint(12, 60))]
+        lines.append(f"{rng.choice(SPEAKERS)}: {' '.join(turn)}.")
+        count += len(turn) + 1
+    return lines
+
+
+def write_document(path: str, lines: List[str]):
+    extension = os.path.splitext(path)[1]
+    if extension == ".txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+    elif extension == ".docx":
+        from docx import Document
+
+        document = Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(path)
+    elif extension == ".pdf":
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+        style = getSampleStyleSheet()["Normal"]
+        SimpleDocTemplate(path, pagesize=letter).build([Paragraph(line or "&nbsp;", style) for line in lines])
+    else:
+        raise ValueError(f"Unsupported corpus format: {extension}")
+
+
+def build_corpus(corpus_dir: str, sizes: Dict[str, int], formats: List[str]) -> List[str]:
+    """Write any missing corpus documents and return all their paths"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for index, (label, words) in enumerate(sizes.items()):
+        lines = None
+        for fmt in formats:
+            path = os.path.join(corpus_dir, f"{label}_{words}.{fmt}")
+            if not os.path.exists(path):
+                lines = lines or synthetic_transcript(words, seed=index)
+                write_document(path, lines)
+            paths.append(path)
+    return paths
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where the resource module is missing (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def warm_up():
+    """Load the extraction and export libraries, so one-off import costs stay out of the percentiles
+
+    startup_benchmark.py measures those costs.
+    """
+    import PyPDF2  # noqa: F401
+    import docx  # noqa: F401
+
+    for create, _ in EXPORT_FORMATS.values():
+        create(CANNED_SUMMARY, "warm-up")
+
+
+def run_document(path: str, client: AzureOpenAIWrapper, telemetry: Telemetry, extraction_options: Dict,
+                 agent_options: Dict) -> str:
+    """Extract, summarize and export one document; returns the pipeline path taken
+
+    agent_options are keyword arguments for ClientSummaryAgents (streaming, parallel_extraction, ...).
+    """
+    fmt = os.path.splitext(path)[1].lstrip(".")
+    with telemetry.timer(f"extraction_{fmt}", source=os.path.basename(path)) as fields:
+        text = DocumentProcessor.extract_text_from_path(path, **extraction_options)
+        fields["chars"] = len(text)
+
+    agents = ClientSummaryAgents(client, telemetry=telemetry, **agent_options)
+    try:
+        result = agents.process_document(text, on_summary_delta=(lambda delta: None) if agents.streaming else None)
+    except StageFailedError:
+        return "failed"
+
+    parsed = parse_summary(result["final_summary"])
+    for export_format, (create, _) in EXPORT_FORMATS.items():
+        with telemetry.timer(f"export_{export_format}"):
+            create(result["final_summary"], path, parsed)
+    return result["pipeline_path"]
+
+
+def run_benchmark(args) -> Dict:
+    sizes = {label: int(words) for label, words in (item.split(":") for item in args.sizes.split(","))}
+    if args.documents:
+        paths = [os.path.join(args.documents, path) for path in find_documents(args.documents)]
+    else:
+        paths = build_corpus(args.corpus_dir, sizes, args.formats.split(","))
+    documents = paths * max(1, args.repeat)
+    extraction_options = load_extraction_options()
+    warm_up()
+
+    server = FakeChatCompletionsServer(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, cached_fraction=args.cached_fraction, seed=args.seed,
+        prefix_caching=args.prefix_cache
+    )
+    telemetry = Telemetry(max_samples=100000)
+    agent_options = dict(
+        streaming=args.stream, parallel_extraction=args.parallel, fast_mode=args.fast, compact=args.compact,
+        router=ModelRouter(fast_model=args.fast_model, fast_max_input_tokens=args.fast_max_input_tokens)
+    )
+    cassette = Cassette(args.cassette, REPLAY, args.cassette_timing) if args.cassette else None
+    with server:
+        client = AzureOpenAIWrapper(
+            api_key="offline-benchmark", endpoint=server.endpoint, model="fake-deployment",
+            max_connections=max(4, args.concurrency * 4),
+            retry_policy=RetryPolicy(max_attempts=args.max_attempts, base_delay=0.05),
+            cassette=cassette
+        )
+        if args.trace_memory:
+            tracemalloc.start()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            paths_taken = list(pool.map(
+                lambda path: run_document(path, client, telemetry, extraction_options, agent_options),
+                documents
+            ))
+        wall = time.monotonic() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+        if args.trace_memory:
+            tracemalloc.stop()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "documents": len(documents),
+        "wall_seconds": round(wall, 2),
+        "throughput_docs_per_min": round(len(documents) / wall * 60, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "steps": telemetry.summary(),
+        "pipeline_paths": {path: paths_taken.count(path) for path in sorted(set(paths_taken))},
+        "server": dict(server.stats),
+        "config": {name: getattr(args, name) for name in (
+            "sizes", "formats", "repeat", "concurrency", "stream", "parallel", "fast", "compact", "fast_model", "fast_max_input_tokens",
+            "latency", "tokens_per_second",
+            "error_rate", "rate_limit_rate", "cached_fraction", "prefix_cache", "seed", "documents", "cassette",
+            "cassette_timing")},
+    }
+    if cassette is not None:
+        report["cassette"] = {"recordings": len(cassette), "hits": cassette.hits, "misses": cassette.misses}
+    if traced_peak is not None:
+        report["traced_peak_mb"] = round(traced_peak / (1024 * 1024), 1)
+    return report
+
+
+def _metric(value) -> str:
+    return "n/a" if value is None else str(value)
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print current against baseline and return a description of each regression"""
+    checks = [("throughput_docs_per_min", report["throughput_docs_per_min"],
+               baseline.get("throughput_docs_per_min"), True),
+              ("peak_rss_mb", report["peak_rss_mb"], baseline.get("peak_rss_mb"), False)]
+    for step, values in sorted(report["steps"].items()):
+        for key in ("p50_ms", "p95_ms"):
+            checks.append((f"{step}.{key}", values[key], baseline.get("steps", {}).get(step, {}).get(key), False))
+
+    if baseline.get("config") != report["config"]:
+        print("WARNING: baseline was recorded with different settings; differences may not be regressions")
+    regressions = []
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current, previous, higher_is_better in checks:
+        if current is None or previous is None:
+            # peak_rss_mb is None where the resource module is unavailable
+            change = "new" if previous is None and current is not None else "n/a"
+            print(f"{name:<40} {_metric(previous):>12} {_metric(current):>12} {change:>9}")
+            continue
+        change = (current - previous) / previous if previous else 0.0
+        print(f"{name:<40} {previous:>12} {current:>12} {change:>+9.1%}")
+        worse = -change if higher_is_better else change
+        if worse > tolerance and (not name.endswith("_ms") or abs(current - previous) >= MIN_REGRESSION_MS):
+            regressions.append(f"{name} {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark extraction, the agent pipeline and exports offline")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated label:words transcript sizes")
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help="Comma-separated corpus formats")
+    parser.add_argument("--corpus-dir", default=".bench_corpus", help="Where the synthetic corpus is kept")
+    parser.add_argument("--documents", help="Benchmark the documents in this directory instead of the corpus")
+    parser.add_argument("--cassette", help="Replay model calls from this recorded cassette instead of the fake server")
+    parser.add_argument("--cassette-timing", type=float, default=1.0,
+                        help="Scale of the recorded latency when replaying (0 answers at once)")
+    parser.add_argument("--repeat", type=int, default=1, help="Process the corpus this many times")
+    parser.add_argument("--concurrency", type=int, default=1, help="Documents processed at once")
+    parser.add_argument("--stream", action="store_true", help="Stream the final summary")
+    parser.add_argument("--fast", action="store_true",
+                        help="Single-call summaries, reviewed only when validation fails or the document is long")
+    parser.add_argument("--compact", action="store_true", help="Send the full document only to the analysis stage")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Run the three extraction stages concurrently instead of the Document Analyzer")
+    parser.add_argument("--fast-model",
+                        help="Route short analysis and extraction calls to this deployment (counted per deployment)")
+    parser.add_argument("--fast-max-input-tokens", type=int, default=4000,
+                        help="Largest estimated input, in tokens, sent to --fast-model")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Fake server output token rate (0 returns the whole response at once)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with a 429")
+    parser.add_argument("--cached-fraction", type=float, default=0.0,
+                        help="Fraction of long prompts the fake server reports as cached")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="Report cached tokens from prompt prefixes shared with earlier calls instead")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Attempts per call, as in RetryPolicy")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for injected failures")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the tracemalloc peak (slows the run down)")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this stored report")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression before the comparison fails")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    for regression in regressions:
+        print(f"FAIL: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
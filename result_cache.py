@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+class ResultCache:
+    """Content-addressed on-disk cache for pipeline results with LRU eviction"""
+
+    def __init__(self, cache_dir: str = ".summary_cache", max_bytes: int = 50 * 1024 * 1024,
+                 max_age_seconds: int = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        # Per-chunk analysis lookups are counted apart from whole-document results
+        self.chunk_hits = 0
+        self.chunk_misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(document_text: str, model: str, api_version: str, prompt_version: str,
+                 format_template: str = "") -> str:
+        """Build a cache key from the document text and everything that shapes the output"""
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, api_version, format_template, document_text):
+            encoded = part.encode("utf-8")
+            # Length-prefix each part so adjacent fields cannot run into each other
+            digest.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str, chunk: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key, or None on a miss or expired entry
+
+        Lookups with chunk=True count toward chunk_hits/chunk_misses instead of hits/misses.
+        """
+        path = self._path(key)
+        with self._lock:
+            entry = self._read(path)
+            if chunk:
+                if entry is None:
+                    self.chunk_misses += 1
+                else:
+                    self.chunk_hits += 1
+            elif entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Touch the file so eviction treats it as recently used
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store entry under key and evict old or least recently used entries"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        # Oldest access first
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> Dict[str, int]:
+        """Return document and chunk hit/miss counters and current on-disk footprint"""
+        entries = 0
+        size = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                try:
+                    size += os.path.getsize(os.path.join(self.cache_dir, name))
+                    entries += 1
+                except OSError:
+                    continue
+        return {"hits": self.hits, "misses": self.misses, "chunk_hits": self.chunk_hits,
+                "chunk_misses": self.chunk_misses, "entries": entries, "bytes": size}
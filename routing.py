@@ -0,0 +1,66 @@
+"""Per-call deployment routing and output budgets
+
+Before each model call the router estimates the call's input tokens locally. Short
+inputs to the stages listed in fast_stages go to the fast deployment, and every
+call gets an output budget scaled to its input within the stage's limits (see
+StageDefinition). Without a fast deployment every call stays on the client's own.
+"""
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agent_registry import STAGE_REGISTRY
+from chunking import estimate_tokens
+
+# Output budgets are rounded up to this many tokens, so similar inputs share a budget
+BUDGET_STEP = 128
+# Stages whose output feeds a later stage rather than the final summary
+DEFAULT_FAST_STAGES = ("DocumentAnalyzer", "MeetingDetailsExtractor", "DecisionExtractor", "ActionItemExtractor")
+
+
+@dataclass(frozen=True)
+class Route:
+    """Deployment and output budget for one model call; model None means the client's deployment"""
+    stage: str
+    model: Optional[str]
+    max_tokens: int
+    input_tokens: int
+
+    def describe(self, default_model: str) -> str:
+        return (f"Routed to {self.model or default_model} with max_tokens {self.max_tokens:,} "
+                f"(~{self.input_tokens:,} input tokens)")
+
+
+class ModelRouter:
+    """Chooses the deployment and max_tokens of each call from its stage and estimated input size"""
+
+    def __init__(self, fast_model: str = None, fast_max_input_tokens: int = 4000,
+                 fast_stages: Tuple[str, ...] = DEFAULT_FAST_STAGES):
+        self.fast_model = fast_model
+        self.fast_max_input_tokens = fast_max_input_tokens
+        self.fast_stages = tuple(fast_stages)
+
+    @property
+    def signature(self) -> str:
+        """Routing settings that change the output, for cache keys; empty when nothing is routed"""
+        if not self.fast_model:
+            return ""
+        return f"routed-{self.fast_model}-{self.fast_max_input_tokens}-{','.join(self.fast_stages)}"
+
+    @staticmethod
+    def input_tokens(messages: List[Dict]) -> int:
+        """Estimated tokens of everything but the system prefix, which is the same for every call"""
+        return sum(estimate_tokens(message["content"]) for message in messages if message["role"] != "system")
+
+    def output_budget(self, stage: str, input_tokens: int, template: str = "full") -> int:
+        definition = STAGE_REGISTRY[stage]
+        floor = definition.template_min_output_tokens.get(template, definition.min_output_tokens)
+        budget = math.ceil(input_tokens * definition.output_ratio / BUDGET_STEP) * BUDGET_STEP
+        return min(definition.max_output_tokens, max(floor, budget))
+
+    def route(self, stage: str, messages: List[Dict], template: str = "full") -> Route:
+        input_tokens = self.input_tokens(messages)
+        model = None
+        if self.fast_model and stage in self.fast_stages and input_tokens <= self.fast_max_input_tokens:
+            model = self.fast_model
+        return Route(stage, model, self.output_budget(stage, input_tokens, template), input_tokens)
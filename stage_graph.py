@@ -0,0 +1,111 @@
+"""Declarative stage graph and the scheduler that runs it
+
+A graph maps each stage to the stages whose output it needs. The scheduler starts
+every stage as soon as those have finished, so independent stages run at the same
+time and latency follows the critical path instead of the sum of all stages.
+"""
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+class StageGraph:
+    """Stages and their dependencies, checked for unknown stages and cycles when built"""
+
+    def __init__(self, dependencies: Dict[str, Tuple[str, ...]]):
+        self.dependencies = {stage: tuple(needs) for stage, needs in dependencies.items()}
+        for stage, needs in self.dependencies.items():
+            unknown = [need for need in needs if need not in self.dependencies]
+            if unknown:
+                raise ValueError(f"Stage {stage} depends on unknown stages: {', '.join(unknown)}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        remaining = dict(self.dependencies)
+        order = []
+        while remaining:
+            ready = [stage for stage, needs in remaining.items() if all(need in order for need in needs)]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle through: {', '.join(remaining)}")
+            order.extend(ready)
+            for stage in ready:
+                del remaining[stage]
+        return order
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self.dependencies
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def ready(self, done: Dict[str, Any], started: set) -> List[str]:
+        """Stages not yet started whose dependencies are all in done"""
+        return [stage for stage in self.order
+                if stage not in started and all(need in done for need in self.dependencies[stage])]
+
+    def critical_path(self, durations: Dict[str, float]) -> Tuple[List[str], float]:
+        """Longest chain of dependent stages by duration, and its total in seconds"""
+        finish = {}
+        previous = {}
+        for stage in self.order:
+            needs = self.dependencies[stage]
+            slowest = max(needs, key=lambda need: finish[need], default=None)
+            previous[stage] = slowest
+            finish[stage] = (finish[slowest] if slowest else 0.0) + durations.get(stage, 0.0)
+        if not finish:
+            return [], 0.0
+        stage = max(finish, key=finish.get)
+        total = finish[stage]
+        path = []
+        while stage is not None:
+            path.append(stage)
+            stage = previous[stage]
+        return path[::-1], total
+
+
+def run_graph(graph: StageGraph, runners: Dict[str, Callable[[Dict[str, Any]], Any]]) -> Dict[str, Any]:
+    """Run every stage in worker threads once its dependencies are done and return all outputs
+
+    Each runner receives the outputs of the stages it depends on. If a stage raises,
+    no further stages start and the exception is re-raised once running stages finish.
+    """
+    outputs = {}
+    started = set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(graph)), thread_name_prefix="stage") as executor:
+        while len(outputs) < len(graph):
+            for stage in graph.ready(outputs, started):
+                needs = {need: outputs[need] for need in graph.dependencies[stage]}
+                running[executor.submit(runners[stage], needs)] = stage
+                started.add(stage)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                # result() re-raises the stage's exception; the executor waits for the others
+                outputs[stage] = future.result()
+    return outputs
+
+
+async def run_graph_async(graph: StageGraph,
+                          runners: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]]) -> Dict[str, Any]:
+    """Asyncio counterpart of run_graph; a failing stage cancels the stages still running"""
+    outputs = {}
+    started = set()
+    running = {}
+    try:
+        while len(outputs) < len(graph):
+            for stage in graph.ready(outputs, started):
+                needs = {need: outputs[need] for need in graph.dependencies[stage]}
+                running[asyncio.ensure_future(runners[stage](needs))] = stage
+                started.add(stage)
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                stage = running.pop(task)
+                outputs[stage] = task.result()
+    finally:
+        for task in running:
+            task.cancel()
+    return outputs
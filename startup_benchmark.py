@@ -0,0 +1,102 @@
+"""Cold-start benchmark: time from a fresh interpreter to the rendered login form
+
+Usage:
+    python startup_benchmark.py [--runs 5] [--budget-ms 1500] [--record startup_history.jsonl]
+
+Each run starts a new Python process and executes app.py through Streamlit's
+AppTest harness until the login form is on screen. The benchmark fails when the
+median exceeds the budget, or when a heavy dependency that only the pipeline or
+the exports need was imported before login.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Dependencies that must stay off the path to the login screen
+HEAVY_MODULES = ["openai", "httpx", "reportlab", "docx", "PyPDF2", "pandas", "tiktoken"]
+
+DEFAULT_BUDGET_MS = 1500
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def measure_once() -> dict:
+    """Render the login form once in this process and report timings and loaded modules"""
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    harness_loaded = time.perf_counter()
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    rendered = time.perf_counter()
+
+    labels = [field.label for field in app.text_input]
+    return {
+        "harness_ms": round((harness_loaded - start) * 1000, 1),
+        "render_ms": round((rendered - start) * 1000, 1),
+        "login_rendered": "Username" in labels and not app.exception,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def run_child() -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(APP_PATH)
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # Wall time includes interpreter start-up, which a fresh worker also pays
+    result["process_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold start of app.py up to the login form")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help="Fail when the median render time exceeds this")
+    parser.add_argument("--record", help="Append the run summary to this JSONL file to track it over time")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return 0
+
+    runs = [run_child() for _ in range(max(1, args.runs))]
+    render = sorted(run["render_ms"] for run in runs)
+    process = sorted(run["process_ms"] for run in runs)
+    summary = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "runs": len(runs),
+        "render_ms_median": round(statistics.median(render), 1),
+        "render_ms_max": render[-1],
+        "process_ms_median": round(statistics.median(process), 1),
+        "harness_ms_median": round(statistics.median(run["harness_ms"] for run in runs), 1),
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]}),
+        "budget_ms": args.budget_ms,
+    }
+    print(json.dumps(summary, indent=2))
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary) + "\n")
+
+    failures = []
+    if not all(run["login_rendered"] for run in runs):
+        failures.append("login form did not render")
+    if summary["heavy_modules"]:
+        failures.append(f"heavy modules imported before login: {', '.join(summary['heavy_modules'])}")
+    if summary["render_ms_median"] > args.budget_ms:
+        failures.append(f"median {summary['render_ms_median']}ms exceeds budget {args.budget_ms}ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+# Header fields of the required format, as (attribute, label)
+HEADER_FIELDS = [
+    ("date_of_meeting", "Date of Meeting"),
+    ("participants", "Participants"),
+    ("client_name", "Client Name"),
+    ("meeting_type", "Meeting Type"),
+]
+
+# Body sections of the required format, as (key, number, heading)
+SECTIONS = [
+    ("objectives", 1, "Objectives of the Meeting"),
+    ("discussion_points", 2, "Key Discussion Points"),
+    ("decisions", 3, "Decisions Made"),
+    ("action_items", 4, "Action Items"),
+    ("key_takeaways", None, "Key Takeaways"),
+]
+
+TITLE = "Client Interaction Summary"
+
+_HEADER_PATTERN = re.compile(
+    r"^\s*(" + "|".join(label for _, label in HEADER_FIELDS) + r")\s*:\s*(.*)$", re.IGNORECASE
+)
+_SECTION_PATTERNS = [
+    (key, re.compile(
+        (rf"^\s*{number}\.\s*" if number else r"^\s*") + re.escape(heading) + r"[^:]*?(?::\s*(.*))?$",
+        re.IGNORECASE
+    ))
+    for key, number, heading in SECTIONS
+]
+_SECTION_HEADINGS = {key: heading for key, _, heading in SECTIONS}
+_HEADER_ATTRIBUTES = {label.lower(): attr for attr, label in HEADER_FIELDS}
+# Owner markers inside Action Items, e.g. "For RM:", "Client Action Items:", "- RM (Priya): send proposal".
+# The colon must follow the owner label directly, so items such as "RM to call at 10:30" keep their text.
+_OWNER_PATTERN = re.compile(
+    r"^[\s\-•*]*(?:for\s+(?:the\s+)?)?(rm|relationship manager|client)(?:\s+(?:action items?|actions|tasks))?"
+    r"\s*(?:\([^)]*\))?\s*:\s*(.*)$",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class SummarySection:
+    key: str
+    heading: str
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ParsedSummary:
+    """Typed view of a summary in the required Client Interaction Summary format"""
+    date_of_meeting: Optional[str] = None
+    participants: Optional[str] = None
+    client_name: Optional[str] = None
+    meeting_type: Optional[str] = None
+    sections: List[SummarySection] = field(default_factory=list)
+    action_items_rm: List[str] = field(default_factory=list)
+    action_items_client: List[str] = field(default_factory=list)
+    action_items_other: List[str] = field(default_factory=list)
+    # Lines outside any recognized header or section, kept so nothing is lost on export
+    preamble: List[str] = field(default_factory=list)
+    has_markdown_bold: bool = False
+
+    def section(self, key: str) -> Optional[SummarySection]:
+        for section in self.sections:
+            if section.key == key:
+                return section
+        return None
+
+    @property
+    def display_client_name(self) -> str:
+        """Client name without template brackets, as used for history entries"""
+        name = (self.client_name or "").replace('[', '').replace(']', '').strip()
+        return name or "Unknown Client"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ParsedSummary":
+        values = dict(data)
+        values["sections"] = [SummarySection(**section) for section in data.get("sections", [])]
+        return cls(**values)
+
+
+def parse_summary(summary: str) -> ParsedSummary:
+    """Parse a summary into header fields, sections and owner-split action items in one pass
+
+    >>> parsed = parse_summary("4. Action Items :\\nFor RM:\\n- RM to call the client at 10:30 on Monday\\n"
+    ...                        "Client Action Items:\\n- Send KYC documents by Friday: pending\\n- Note: fees apply")
+    >>> parsed.action_items_rm
+    ['RM to call the client at 10:30 on Monday']
+    >>> parsed.action_items_client
+    ['Send KYC documents by Friday: pending', 'Note: fees apply']
+    >>> parse_summary("4. Action Items :\\n- RM (Priya): send the proposal").action_items_rm
+    ['send the proposal']
+    """
+    parsed = ParsedSummary(has_markdown_bold="**" in summary)
+    current = None
+    owner = None
+
+    for raw_line in summary.splitlines():
+        line = raw_line.replace("**", "").rstrip()
+        if not line.strip():
+            continue
+        if current is None and line.strip().lower() == TITLE.lower():
+            continue
+
+        header = _HEADER_PATTERN.match(line)
+        if header and current is None:
+            setattr(parsed, _HEADER_ATTRIBUTES[header.group(1).lower()], header.group(2).strip())
+            continue
+
+        matched_section = False
+        for key, pattern in _SECTION_PATTERNS:
+            match = pattern.match(line)
+            if match and (key != "key_takeaways" or parsed.section(key) is None):
+                current = SummarySection(key=key, heading=_SECTION_HEADINGS[key])
+                parsed.sections.append(current)
+                owner = None
+                if match.group(1):
+                    current.lines.append(match.group(1).strip())
+                matched_section = True
+                break
+        if matched_section:
+            continue
+
+        if current is None:
+            parsed.preamble.append(line.strip())
+            continue
+
+        current.lines.append(line.strip())
+        if current.key == "action_items":
+            owner_match = _OWNER_PATTERN.match(line)
+            if owner_match:
+                owner = "client" if owner_match.group(1).lower() == "client" else "rm"
+                item = owner_match.group(2).strip()
+                if not item:
+                    # A sub-heading such as "For RM:"; following lines belong to that owner
+                    continue
+            else:
+                item = line.strip()
+            item = item.lstrip("-•* ").strip()
+            {"rm": parsed.action_items_rm, "client": parsed.action_items_client}.get(
+                owner, parsed.action_items_other
+            ).append(item)
+
+    return parsed
+
+
+def validate_summary(summary: str, parsed: ParsedSummary = None) -> List[str]:
+    """Return the format problems in summary; an empty list means it is well formed"""
+    parsed = parsed or parse_summary(summary)
+    problems = [
+        f"Missing heading: {label}"
+        for attr, label in HEADER_FIELDS
+        if getattr(parsed, attr) is None
+    ]
+    present = {section.key for section in parsed.sections}
+    problems.extend(
+        f"Missing heading: {f'{number}. ' if number else ''}{heading}"
+        for key, number, heading in SECTIONS
+        if key not in present
+    )
+    if parsed.has_markdown_bold:
+        problems.append("Contains ** markdown formatting")
+    return problems
@@ -0,0 +1,176 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens")
+METRIC_PREFIX = "client_summary"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of values, or None when there are none"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """Durations and token usage per pipeline step, with p50/p95 over the most recent samples
+
+    A step is a pipeline stage (DocumentAnalyzer, ...), a whole document ("pipeline"),
+    text extraction or an export. Durations come from a monotonic clock; token totals
+    and costs are cumulative for the life of the process.
+    """
+
+    def __init__(self, max_samples: int = 1000, jsonl_path: str = None, prompt_price_per_1k: float = 0.0,
+                 cached_price_per_1k: float = 0.0, completion_price_per_1k: float = 0.0):
+        self.max_samples = max_samples
+        self.jsonl_path = jsonl_path
+        self.prices_per_1k = {
+            "prompt_tokens": prompt_price_per_1k,
+            "cached_tokens": cached_price_per_1k,
+            "completion_tokens": completion_price_per_1k,
+        }
+        self._events = deque(maxlen=max_samples)
+        self._durations = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def tracks_cost(self) -> bool:
+        return any(self.prices_per_1k.values())
+
+    def cost(self, usage: Dict[str, int]) -> float:
+        """Price of one call's usage; cached prompt tokens are billed at the cached price"""
+        cached = usage.get("cached_tokens", 0)
+        return (
+            (usage.get("prompt_tokens", 0) - cached) * self.prices_per_1k["prompt_tokens"]
+            + cached * self.prices_per_1k["cached_tokens"]
+            + usage.get("completion_tokens", 0) * self.prices_per_1k["completion_tokens"]
+        ) / 1000
+
+    def record(self, step: str, duration: float, usage: Dict[str, int] = None, **fields) -> Dict[str, Any]:
+        """Record one step taking duration seconds, with optional token usage and extra fields"""
+        usage = {key: usage[key] for key in TOKEN_FIELDS if key in usage} if usage else {}
+        event = {"ts": round(time.time(), 3), "step": step, "duration_ms": round(duration * 1000, 1)}
+        event.update(usage)
+        if usage and self.tracks_cost:
+            event["cost"] = round(self.cost(usage), 6)
+        event.update(fields)
+
+        with self._lock:
+            self._events.append(event)
+            self._durations.setdefault(step, deque(maxlen=self.max_samples)).append(duration)
+            totals = self._totals.setdefault(step, dict({"count": 0, "duration_seconds": 0.0, "cost": 0.0},
+                                                        **dict.fromkeys(TOKEN_FIELDS, 0)))
+            totals["count"] += 1
+            totals["duration_seconds"] += duration
+            totals["cost"] += event.get("cost", 0.0)
+            for key, value in usage.items():
+                totals[key] += value
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event) + "\n")
+        return event
+
+    @contextmanager
+    def timer(self, step: str, **fields):
+        """Time the block and record it as step; extra fields, including usage, can be added to the yielded dict"""
+        start = time.monotonic()
+        try:
+            yield fields
+        finally:
+            self.record(step, time.monotonic() - start, fields.pop("usage", None), **fields)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per step: count, p50/p95 duration in ms over recent samples, and cumulative tokens and cost"""
+        with self._lock:
+            durations = {step: list(samples) for step, samples in self._durations.items()}
+            totals = {step: dict(values) for step, values in self._totals.items()}
+        summary = {}
+        for step, samples in durations.items():
+            values = totals[step]
+            summary[step] = {
+                "count": values["count"],
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+                **{key: values[key] for key in TOKEN_FIELDS},
+            }
+            if self.tracks_cost:
+                summary[step]["cost"] = round(values["cost"], 4)
+        return summary
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def to_jsonl(self) -> str:
+        """The recent events, one JSON object per line"""
+        return "".join(json.dumps(event) + "\n" for event in self.events())
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition of durations (p50/p95 summary), tokens and cost per step"""
+        with self._lock:
+            durations = {step: list(samples) for step, samples in self._durations.items()}
+            totals = {step: dict(values) for step, values in self._totals.items()}
+
+        duration_metric = f"{METRIC_PREFIX}_step_duration_seconds"
+        lines = [f"# HELP {duration_metric} Duration of pipeline steps; quantiles over recent samples",
+                 f"# TYPE {duration_metric} summary"]
+        for step, samples in sorted(durations.items()):
+            label = f'step="{_label(step)}"'
+            for quantile in (0.5, 0.95):
+                lines.append(f'{duration_metric}{{{label},quantile="{quantile}"}} {percentile(samples, quantile):.6f}')
+            lines.append(f"{duration_metric}_sum{{{label}}} {totals[step]['duration_seconds']:.6f}")
+            lines.append(f"{duration_metric}_count{{{label}}} {totals[step]['count']}")
+
+        tokens_metric = f"{METRIC_PREFIX}_tokens_total"
+        lines += [f"# HELP {tokens_metric} Tokens reported by Azure OpenAI per step and kind",
+                  f"# TYPE {tokens_metric} counter"]
+        for step, values in sorted(totals.items()):
+            for key in TOKEN_FIELDS:
+                kind = key[:-len("_tokens")]
+                lines.append(f'{tokens_metric}{{step="{_label(step)}",kind="{kind}"}} {values[key]}')
+
+        if self.tracks_cost:
+            cost_metric = f"{METRIC_PREFIX}_cost_total"
+            lines += [f"# HELP {cost_metric} Estimated spend per step from the configured token prices",
+                      f"# TYPE {cost_metric} counter"]
+            for step, values in sorted(totals.items()):
+                lines.append(f'{cost_metric}{{step="{_label(step)}"}} {values["cost"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1"):
+        """Serve to_prometheus() at http://host:port/metrics from a daemon thread and return the server"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="telemetry-metrics", daemon=True).start()
+        return server